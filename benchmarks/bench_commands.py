@@ -0,0 +1,129 @@
+"""Latencia de /guerra, /liga, /capital y /miembros contra una API de CoC y un Telegram falsos.
+
+Por cada comando informa p50/p95 y las llamadas a la API y a Telegram por ejecución, y
+comprueba que cada ejecución termina publicando en el tópico; si alguna no, sale con error.
+Por defecto cada ejecución empieza con la caché de respuestas vacía (peor caso tras
+expirar el TTL); con --warm se mide el estado estable con caché.
+
+Uso:
+    python -m benchmarks.bench_commands [--iterations 50] [--mongomock]
+        [--fixtures benchmarks/coc_fixtures.json] [--api-latency 0.05] [--telegram-latency 0.03]
+
+Sin --mongomock se usa el MongoDB de MONGO_DB_URI, en la base BENCH_MONGO_DB_NAME
+(friends_bot_bench por defecto).
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.fixtures import generate_fixtures, load_fixtures
+from benchmarks.harness import (
+    BENCH_CLAN_TAG,
+    FakeBot,
+    FakeCocServer,
+    configure_environment,
+    delivery_error,
+    make_context,
+    make_update,
+    percentile,
+    use_mongomock
+)
+
+
+def fixtures_clan_tag(fixtures) -> str:
+    """Tag del clan de unas fixtures (el de la primera ruta /clans/<tag>)"""
+    for endpoint in fixtures:
+        parts = endpoint.split('/')
+        if len(parts) == 3 and parts[1] == 'clans':
+            return parts[2]
+    return BENCH_CLAN_TAG
+
+
+async def run_benchmarks(args, fixtures):
+    # Importaciones diferidas: config ya lee el entorno preparado para el benchmark
+    from bot.coc_cache import coc_cache
+    from bot.coc_client import coc_client
+    from bot.capital_tracker import capital_tracker
+    from bot.commands import capital, clan, league, war
+    from bot.utils import send_queue
+    from config import CLAN_TAG
+
+    server = FakeCocServer(fixtures, latency=args.api_latency)
+    server.start()
+    coc_client.base_url = server.url
+    bot = FakeBot(latency=args.telegram_latency)
+    send_queue.bot = bot
+
+    # /miembros se sirve desde la foto guardada, como en producción
+    members = fixtures.get(f"/clans/{CLAN_TAG.replace('%23', '#')}/members", {}).get('items', [])
+    await clan.members_dao.save_snapshot(members)
+
+    commands = {
+        "/guerra": war.guerra,
+        "/liga": league.liga,
+        "/capital": capital.capital,
+        "/miembros": clan.miembros
+    }
+    failures = []
+    print(f"{'comando':<10} {'p50 ms':>9} {'p95 ms':>9} {'API/ejec':>9} {'Telegram/ejec':>14}")
+    try:
+        for name, handler in commands.items():
+            latencies = []
+            api_calls = telegram_calls = 0
+            for i in range(args.warmup + args.iterations):
+                if not args.warm:
+                    coc_cache.invalidate()
+                    capital_tracker.updated_at = None
+                update = make_update(bot, text=name)
+                context = make_context(bot)
+                api_before, telegram_before = server.total_calls, bot.total_calls
+                sent_before = len(bot.sent)
+
+                started = time.perf_counter()
+                await handler(update, context)
+                elapsed = time.perf_counter() - started
+
+                error = delivery_error(bot, sent_before)
+                if error:
+                    failures.append(f"{name} (ejecución {i + 1}): {error}")
+                if i >= args.warmup:
+                    latencies.append(elapsed * 1000)
+                    api_calls += server.total_calls - api_before
+                    telegram_calls += bot.total_calls - telegram_before
+            print(
+                f"{name:<10} {percentile(latencies, 50):>9.2f} {percentile(latencies, 95):>9.2f} "
+                f"{api_calls / args.iterations:>9.1f} {telegram_calls / args.iterations:>14.1f}"
+            )
+    finally:
+        await coc_client.close()
+        server.stop()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=1, help="ejecuciones iniciales que no se miden")
+    parser.add_argument("--fixtures", help="fichero grabado con `python -m benchmarks.fixtures --record`")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="segundos por petición a la API")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="segundos por llamada a Telegram")
+    parser.add_argument("--warm", action="store_true", help="no vaciar la caché entre ejecuciones")
+    parser.add_argument("--mongomock", action="store_true", help="usar mongomock (pip install -r requirements-dev.txt) en lugar de MongoDB")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else generate_fixtures(BENCH_CLAN_TAG)
+    configure_environment(fixtures_clan_tag(fixtures))
+    if args.mongomock:
+        use_mongomock()
+    failures = asyncio.run(run_benchmarks(args, fixtures))
+    if failures:
+        # Un comando que no publica mide el camino de error, no el comando
+        print(f"\n{len(failures)} ejecuciones no publicaron en el tópico:", file=sys.stderr)
+        for failure in failures[:10]:
+            print(f"  {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
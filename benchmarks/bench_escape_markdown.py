@@ -0,0 +1,58 @@
+"""Micro-benchmark del escapado MarkdownV2 sobre un mensaje de lista de miembros de ~4 KB.
+
+Uso: python -m benchmarks.bench_escape_markdown
+"""
+import random
+import timeit
+
+from bot.markdown import escape_markdown
+
+
+def escape_markdown_legacy(text: str) -> str:
+    """Implementación anterior (bucle carácter a carácter), como referencia"""
+    escape_chars = '_*[]()~`>#+-=|{}.!'
+    result = []
+    i = 0
+    while i < len(text):
+        if text[i] == '\\' and i + 1 < len(text):
+            result.append(f'\\{text[i + 1]}')
+            i += 2
+        elif text[i] in escape_chars:
+            result.append(f'\\{text[i]}')
+            i += 1
+        else:
+            result.append(text[i])
+            i += 1
+    return ''.join(result)
+
+
+def build_members_message(size: int = 4096) -> str:
+    """Mensaje parecido al de /miembros: TH, nombre con caracteres especiales y tag"""
+    rng = random.Random(42)
+    alphabet = "abcdefghijklmnopqrstuvwxyzÁÉÍ_*.-!()[]#+ 🔥"
+    lines = ["Jugadores: "]
+    i = 1
+    while sum(len(line) + 1 for line in lines) < size:
+        name = ''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 14)))
+        tag = '#' + ''.join(rng.choice("0289PYLQGRJCUV") for _ in range(8))
+        lines.append(f"{i}. TH{rng.randint(8, 16)} {name} [ {tag} ]")
+        i += 1
+    return '\n'.join(lines)[:size]
+
+
+def main(number: int = 2000):
+    samples = [build_members_message(), "fin con barra \\", "ya\\.escapado \\\\ y \\_ otros"]
+    for sample in samples:
+        assert escape_markdown(sample) == escape_markdown_legacy(sample), sample
+
+    message = build_members_message()
+    legacy = timeit.timeit(lambda: escape_markdown_legacy(message), number=number)
+    current = timeit.timeit(lambda: escape_markdown(message), number=number)
+    print(f"Mensaje de {len(message)} caracteres, {number} iteraciones")
+    print(f"  bucle anterior: {legacy / number * 1e6:8.1f} µs/mensaje")
+    print(f"  actual:          {current / number * 1e6:8.1f} µs/mensaje")
+    print(f"  mejora: x{legacy / current:.1f}")
+
+
+if __name__ == "__main__":
+    main()
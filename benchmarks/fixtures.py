@@ -0,0 +1,297 @@
+"""Respuestas de la API de CoC para los benchmarks: generadas o grabadas de la API real.
+
+Las fixtures son un dict endpoint -> JSON, con el endpoint sin codificar tal y como lo
+pide el bot (`/clans/#TAG/currentwar`). Para grabar las del clan configurado en .env:
+
+    python -m benchmarks.fixtures --record benchmarks/coc_fixtures.json
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+TAG_CHARS = "0289PYLQGRJCUV"
+# Caracteres que obligan a escapar en MarkdownV2, como en los nombres reales
+NAME_CHARS = "abcdefghijklmnopqrstuvwxyzÁÉÍÑ_*.-!()[]#+~ "
+LEAGUE_CLANS = 8
+CWL_TEAM_SIZE = 15
+
+
+def _tag(rng: random.Random) -> str:
+    return '#' + ''.join(rng.choice(TAG_CHARS) for _ in range(9))
+
+
+def _name(rng: random.Random) -> str:
+    return ''.join(rng.choice(NAME_CHARS) for _ in range(rng.randint(4, 15))).strip() or "jugador"
+
+
+def _coc_time(moment: datetime) -> str:
+    return moment.strftime("%Y%m%dT%H%M%S.000Z")
+
+
+def make_players(rng: random.Random, count: int) -> List[Dict]:
+    """Jugadores con tags distintos, nombre y nivel de ayuntamiento"""
+    tags = set()
+    while len(tags) < count:
+        tags.add(_tag(rng))
+    return [
+        {'tag': tag, 'name': _name(rng), 'townHallLevel': rng.randint(9, 17)}
+        for tag in sorted(tags)
+    ]
+
+
+def _war_side(rng: random.Random, clan: Dict, players: List[Dict], targets: List[Dict],
+              attacks_per_member: int, order_start: int) -> Dict:
+    """Un lado de una guerra; los ataques se hacen contra `targets`"""
+    members = []
+    stars = 0
+    attacks_done = 0
+    destruction = 0.0
+    for position, player in enumerate(players, 1):
+        attacks = []
+        for _ in range(rng.randint(0, attacks_per_member)):
+            attack_stars = rng.choice([1, 2, 2, 3, 3, 3])
+            percentage = 100 if attack_stars == 3 else rng.randint(40, 99)
+            attacks.append({
+                'attackerTag': player['tag'],
+                'defenderTag': rng.choice(targets)['tag'],
+                'stars': attack_stars,
+                'destructionPercentage': percentage,
+                'order': order_start + attacks_done,
+                'duration': rng.randint(60, 180)
+            })
+            attacks_done += 1
+            stars += attack_stars
+            destruction += percentage
+        members.append({
+            'tag': player['tag'],
+            'name': player['name'],
+            'townhallLevel': player['townHallLevel'],
+            'mapPosition': position,
+            'attacks': attacks
+        })
+    return {
+        'tag': clan['tag'],
+        'name': clan['name'],
+        'clanLevel': clan['clanLevel'],
+        'attacks': attacks_done,
+        'stars': stars,
+        'destructionPercentage': destruction / (len(players) * attacks_per_member) if attacks_per_member else 0.0,
+        'members': members
+    }
+
+
+def _war(rng: random.Random, state: str, clan: Dict, opponent: Dict,
+         attacks_per_member: int, now: datetime) -> Dict:
+    clan_players, opponent_players = clan['players'], opponent['players']
+    war = {
+        'state': state,
+        'teamSize': len(clan_players),
+        'attacksPerMember': attacks_per_member,
+        'preparationStartTime': _coc_time(now - timedelta(hours=30)),
+        'startTime': _coc_time(now - timedelta(hours=6)),
+        'endTime': _coc_time(now + timedelta(hours=18))
+    }
+    if state == 'preparation':
+        war['clan'] = _war_side(rng, clan, clan_players, opponent_players, 0, 1)
+        war['opponent'] = _war_side(rng, opponent, opponent_players, clan_players, 0, 1)
+    else:
+        war['clan'] = _war_side(rng, clan, clan_players, opponent_players, attacks_per_member, 1)
+        war['opponent'] = _war_side(rng, opponent, opponent_players, clan_players, attacks_per_member,
+                                    war['clan']['attacks'] + 1)
+    return war
+
+
+def _capital_raid(rng: random.Random, members: List[Dict], now: datetime) -> Dict:
+    raid_members = []
+    for player in members:
+        attacks = rng.randint(0, 6)
+        raid_members.append({
+            'tag': player['tag'],
+            'name': player['name'],
+            'attacks': attacks,
+            'attackLimit': 5,
+            'bonusAttackLimit': 1,
+            'capitalResourcesLooted': attacks * rng.randint(1500, 4500)
+        })
+
+    def raid_log(count: int) -> List[Dict]:
+        log = []
+        for _ in range(count):
+            districts = [
+                {
+                    'id': 70000000 + d,
+                    'name': _name(rng),
+                    'districtHallLevel': rng.randint(1, 5),
+                    'destructionPercent': 100,
+                    'stars': 3,
+                    'attackCount': rng.randint(1, 6),
+                    'totalLooted': rng.randint(800, 3000),
+                    'attacks': [
+                        {'attacker': {'tag': p['tag'], 'name': p['name']},
+                         'destructionPercent': rng.randint(20, 100)}
+                        for p in rng.sample(members, rng.randint(1, 6))
+                    ]
+                }
+                for d in range(9)
+            ]
+            log.append({
+                'defender': {'tag': _tag(rng), 'name': _name(rng), 'level': rng.randint(5, 10)},
+                'attackCount': sum(d['attackCount'] for d in districts),
+                'districtCount': len(districts),
+                'districtsDestroyed': len(districts),
+                'districts': districts
+            })
+        return log
+
+    attack_log = raid_log(6)
+    return {
+        'items': [{
+            'state': 'ongoing',
+            'startTime': _coc_time(now - timedelta(days=2)),
+            'endTime': _coc_time(now + timedelta(days=1)),
+            'capitalTotalLoot': sum(m['capitalResourcesLooted'] for m in raid_members),
+            'raidsCompleted': len(attack_log),
+            'totalAttacks': sum(m['attacks'] for m in raid_members),
+            'enemyDistrictsDestroyed': sum(r['districtsDestroyed'] for r in attack_log),
+            'offensiveReward': 0,
+            'defensiveReward': 0,
+            'members': raid_members,
+            'attackLog': attack_log,
+            'defenseLog': raid_log(4)
+        }]
+    }
+
+
+def generate_fixtures(clan_tag: str, seed: int = 1) -> Dict[str, Dict]:
+    """Genera un conjunto completo y determinista de respuestas para el clan `clan_tag`.
+
+    Incluye una guerra 50 vs 50 en curso, un grupo de liga de 8 clanes con sus 28 guerras
+    (5 rondas terminadas, 1 en curso y 1 en preparación) y un asalto a la capital completo.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    roster = make_players(rng, 50)
+    clan = {
+        'tag': clan_tag,
+        'name': 'Friends ' + _name(rng),
+        'clanLevel': 22,
+        'members': len(roster),
+        'clanPoints': 48211,
+        'clanCapitalPoints': 3104,
+        'warWins': 412,
+        'warLosses': 131,
+        'warWinStreak': 7,
+        'warLeague': {'id': 48000015, 'name': 'Cristal I'}
+    }
+    fixtures = {
+        f"/clans/{clan_tag}": clan,
+        f"/clans/{clan_tag}/members": {
+            'items': [
+                {
+                    'tag': p['tag'],
+                    'name': p['name'],
+                    'role': 'member',
+                    'townHallLevel': p['townHallLevel'],
+                    'expLevel': rng.randint(120, 260),
+                    'trophies': rng.randint(3000, 6000),
+                    'donations': rng.randint(0, 3000),
+                    'donationsReceived': rng.randint(0, 3000),
+                    'clanRank': rank
+                }
+                for rank, p in enumerate(roster, 1)
+            ]
+        }
+    }
+
+    war_clan = {**clan, 'players': roster}
+    war_opponent = {'tag': _tag(rng), 'name': _name(rng), 'clanLevel': 20, 'players': make_players(rng, 50)}
+    fixtures[f"/clans/{clan_tag}/currentwar"] = _war(rng, 'inWar', war_clan, war_opponent, 2, now)
+
+    # Liga: todos contra todos (método del círculo), 4 guerras por ronda
+    league_clans = [{**clan, 'players': rng.sample(roster, CWL_TEAM_SIZE)}] + [
+        {'tag': _tag(rng), 'name': _name(rng), 'clanLevel': rng.randint(12, 25),
+         'players': make_players(rng, CWL_TEAM_SIZE)}
+        for _ in range(LEAGUE_CLANS - 1)
+    ]
+    rotation = list(range(LEAGUE_CLANS))
+    rounds = []
+    for round_number in range(LEAGUE_CLANS - 1):
+        state = 'warEnded' if round_number < 5 else 'inWar' if round_number == 5 else 'preparation'
+        war_tags = []
+        for i in range(LEAGUE_CLANS // 2):
+            home, away = league_clans[rotation[i]], league_clans[rotation[-1 - i]]
+            war_tag = _tag(rng)
+            war_tags.append(war_tag)
+            fixtures[f"/clanwarleagues/wars/{war_tag}"] = _war(rng, state, home, away, 1, now)
+        rounds.append({'warTags': war_tags})
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    fixtures[f"/clans/{clan_tag}/currentwar/leaguegroup"] = {
+        'state': 'inWar',
+        'season': now.strftime("%Y-%m"),
+        'clans': [
+            {'tag': c['tag'], 'name': c['name'], 'clanLevel': c['clanLevel'],
+             'members': [{'tag': p['tag'], 'name': p['name'], 'townHallLevel': p['townHallLevel']}
+                         for p in c['players']]}
+            for c in league_clans
+        ],
+        'rounds': rounds
+    }
+
+    fixtures[f"/clans/{clan_tag}/capitalraidseasons?limit=1"] = _capital_raid(rng, roster, now)
+    return fixtures
+
+
+def load_fixtures(path: str) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def record_fixtures(path: str):
+    """Graba las respuestas reales de la API para el clan configurado"""
+    from bot.coc_client import coc_client
+    from config import CLAN_TAG
+
+    clan_tag = CLAN_TAG.replace('%23', '#')
+    endpoints = [
+        f"/clans/{clan_tag}",
+        f"/clans/{clan_tag}/members",
+        f"/clans/{clan_tag}/currentwar",
+        f"/clans/{clan_tag}/currentwar/leaguegroup",
+        f"/clans/{clan_tag}/capitalraidseasons?limit=1"
+    ]
+    fixtures = {}
+    try:
+        for endpoint in endpoints:
+            payload = await coc_client.get(endpoint.replace('#', '%23'))
+            if payload is not None:
+                fixtures[endpoint] = payload
+        group = fixtures.get(f"/clans/{clan_tag}/currentwar/leaguegroup") or {}
+        for round_info in group.get('rounds', []):
+            for war_tag in round_info.get('warTags', []):
+                if war_tag == "#0":
+                    continue
+                payload = await coc_client.get(f"/clanwarleagues/wars/{war_tag.replace('#', '%23')}")
+                if payload is not None:
+                    fixtures[f"/clanwarleagues/wars/{war_tag}"] = payload
+    finally:
+        await coc_client.close()
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, ensure_ascii=False)
+    print(f"{len(fixtures)} respuestas grabadas en {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", metavar="FICHERO", required=True,
+                        help="graba las respuestas reales de la API en este fichero JSON")
+    args = parser.parse_args()
+    asyncio.run(record_fixtures(args.record))
+
+
+if __name__ == "__main__":
+    main()
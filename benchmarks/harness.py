@@ -0,0 +1,320 @@
+"""Piezas comunes de los benchmarks: entorno, servidor falso de la API, Telegram falso y Mongo.
+
+`configure_environment` debe llamarse antes de importar `config` o cualquier módulo del bot.
+"""
+import asyncio
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+BENCH_CHAT_ID = -100123456789
+BENCH_TOPIC_ID = 1
+BENCH_CLAN_TAG = "#2PPYLQG80"
+# Respuesta de send_to_topic cuando falla el envío al grupo
+TOPIC_ERROR_REPLY = "⚠️ Error al enviar al tópico"
+
+
+def configure_environment(clan_tag: str = BENCH_CLAN_TAG):
+    """Valores por defecto para poder importar config sin un .env real.
+
+    La base de datos y el límite de envío se fijan siempre: un benchmark nunca escribe en
+    la base de datos real ni espera a la cubeta de tokens de Telegram.
+    """
+    defaults = {
+        "TELEGRAM_TOKEN": "123456:BENCHMARK",
+        "ALLOWED_GROUP_ID": str(BENCH_CHAT_ID),
+        "ALERTAS_TOPIC_ID": str(BENCH_TOPIC_ID),
+        "COC_API_KEY": "benchmark",
+        "MONGO_DB_URI": "mongodb://localhost:27017",
+        "MONGO_DB_BUILDERS_COLLECTION": "builders"
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.environ["CLAN_TAG"] = clan_tag
+    os.environ["ALLOWED_GROUP_ID"] = str(BENCH_CHAT_ID)
+    os.environ["MONGO_DB_NAME"] = os.getenv("BENCH_MONGO_DB_NAME", "friends_bot_bench")
+    os.environ["TELEGRAM_CHAT_RATE_PER_MINUTE"] = "1000000"
+    os.environ["TELEGRAM_DIGEST_WINDOW"] = "0"
+
+
+def _patch_mongomock_bulk_sort():
+    """pymongo >= 4.11 pasa `sort` a add_update en bulk_write y mongomock 4.3 no lo acepta.
+
+    Los DAO no ordenan sus UpdateOne, así que basta con admitir sort=None.
+    """
+    from mongomock.collection import BulkOperationBuilder
+
+    add_update = BulkOperationBuilder.add_update
+    if "sort" in inspect.signature(add_update).parameters:
+        return
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock no admite UpdateOne(sort=...)")
+        return add_update(self, *args, **kwargs)
+
+    BulkOperationBuilder.add_update = add_update_without_sort
+
+
+def use_mongomock():
+    """Sustituye el cliente de MongoDB por mongomock; debe llamarse antes de crear los DAO.
+
+    Falla en el momento, con las versiones instaladas, si mongomock falta o no puede con
+    las operaciones que usan los DAO (bulk_write con UpdateOne y DeleteOne).
+    """
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock no está instalado: pip install -r requirements-dev.txt")
+    import pymongo
+    from pymongo import DeleteOne, UpdateOne
+    from database import MongoDB
+    from config import MONGO_DB_NAME
+
+    _patch_mongomock_bulk_sort()
+    client = mongomock.MongoClient()
+    try:
+        client["compat_check"]["compat_check"].bulk_write([
+            UpdateOne({"_id": 1}, {"$set": {"ok": True}}, upsert=True),
+            DeleteOne({"_id": 1})
+        ], ordered=False)
+    except Exception as e:
+        raise SystemExit(
+            f"mongomock {mongomock.__version__} no funciona con pymongo {pymongo.version} ({e!r}); "
+            "instala las versiones de requirements-dev.txt"
+        )
+    client.drop_database("compat_check")
+
+    mongo = MongoDB()
+    mongo.client.close()
+    mongo.client = client
+    mongo.db = mongo.client[MONGO_DB_NAME]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class FakeCocServer:
+    """Servidor HTTP local que responde con fixtures y cuenta las peticiones por endpoint"""
+
+    def __init__(self, fixtures: Dict[str, Dict], latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                endpoint = unquote(self.path)
+                with server._lock:
+                    server.calls[endpoint] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                payload = server.fixtures.get(endpoint)
+                if payload is None:
+                    status, body = 404, {"reason": "notFound", "message": endpoint}
+                else:
+                    status, body = 200, payload
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeBot:
+    """Bot de Telegram en memoria: registra cada llamada y simula la latencia de la API"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.sent: List[Dict] = []
+        # Último teclado mostrado en cada chat, para que un usuario simulado elija un botón
+        self.markups: Dict[int, object] = {}
+        self._message_ids = count(1)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    async def _call(self, method: str):
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> "FakeMessage":
+        await self._call("send_message")
+        self.sent.append({"chat_id": chat_id, "text": text, **kwargs})
+        self.markups[chat_id] = kwargs.get("reply_markup")
+        return FakeMessage(self, FakeChat(self, chat_id), text=text, reply_markup=kwargs.get("reply_markup"))
+
+    async def edit_message_text(self, text: str, chat_id: int = None, message_id: int = None, **kwargs):
+        await self._call("edit_message_text")
+        self.markups[chat_id] = kwargs.get("reply_markup")
+        return True
+
+    async def delete_message(self, chat_id: int, message_id: int):
+        await self._call("delete_message")
+        return True
+
+    async def send_chat_action(self, chat_id: int, action: str, **kwargs):
+        await self._call("send_chat_action")
+        return True
+
+    async def answer_callback_query(self, callback_query_id: str, **kwargs):
+        await self._call("answer_callback_query")
+        return True
+
+
+class FakeChat:
+    def __init__(self, bot: FakeBot, chat_id: int = BENCH_CHAT_ID, chat_type: str = "supergroup"):
+        self.bot = bot
+        self.id = chat_id
+        self.type = chat_type
+
+    async def send_action(self, action: str, **kwargs):
+        return await self.bot.send_chat_action(self.id, action, **kwargs)
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat: FakeChat, text: str = "", from_user=None, reply_markup=None):
+        self.bot = bot
+        self.chat = chat
+        self.chat_id = chat.id
+        self.message_id = next(bot._message_ids)
+        self.text = text
+        self.from_user = from_user
+        self.reply_markup = reply_markup
+
+    async def reply_text(self, text: str, **kwargs) -> "FakeMessage":
+        return await self.bot.send_message(self.chat_id, text, **kwargs)
+
+    async def edit_text(self, text: str, **kwargs):
+        self.text = text
+        return await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id, **kwargs)
+
+    async def delete(self):
+        return await self.bot.delete_message(self.chat_id, self.message_id)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot: FakeBot, message: FakeMessage, data: str, from_user):
+        self.bot = bot
+        self.id = str(message.message_id)
+        self.message = message
+        self.data = data
+        self.from_user = from_user
+
+    async def answer(self, *args, **kwargs):
+        return await self.bot.answer_callback_query(self.id)
+
+    async def edit_message_text(self, text: str, **kwargs):
+        return await self.message.edit_text(text, **kwargs)
+
+
+def delivery_error(bot: FakeBot, sent_before: int, chat_id: int = BENCH_CHAT_ID,
+                   topic_id: int = BENCH_TOPIC_ID) -> Optional[str]:
+    """Comprueba que un comando terminó publicando en el tópico; devuelve el fallo o None.
+
+    `sent_before` es len(bot.sent) antes de ejecutar el comando.
+    """
+    sent = bot.sent[sent_before:]
+    if not sent:
+        return "no se envió ningún mensaje"
+    for message in sent:
+        if message["text"] == TOPIC_ERROR_REPLY:
+            return f"respondió con el error del tópico: {message['text']!r}"
+    last = sent[-1]
+    expected = {"chat_id": chat_id, "message_thread_id": topic_id, "parse_mode": "MarkdownV2"}
+    mismatched = {key: last.get(key) for key, value in expected.items() if last.get(key) != value}
+    if mismatched:
+        return f"el último envío no fue al tópico en MarkdownV2: {mismatched}"
+    return None
+
+
+def make_user(user_id: int, username: Optional[str] = None):
+    return SimpleNamespace(
+        id=user_id,
+        username=username or f"user{user_id}",
+        first_name=f"Usuario {user_id}",
+        full_name=f"Usuario {user_id}",
+        is_bot=False
+    )
+
+
+def make_update(bot: FakeBot, text: str = "", user=None, callback_data: Optional[str] = None,
+                chat_id: int = BENCH_CHAT_ID, chat_type: str = "supergroup"):
+    """Update mínimo con lo que usan los comandos: chat, usuario, mensaje y callback"""
+    user = user or make_user(1)
+    chat = FakeChat(bot, chat_id, chat_type)
+    message = FakeMessage(bot, chat, text=text, from_user=user)
+    callback_query = FakeCallbackQuery(bot, message, callback_data, user) if callback_data else None
+    return SimpleNamespace(
+        update_id=message.message_id,
+        effective_chat=chat,
+        effective_user=user,
+        effective_message=message,
+        message=None if callback_query else message,
+        callback_query=callback_query
+    )
+
+
+def callback_options(markup) -> List[str]:
+    """callback_data de todos los botones de un InlineKeyboardMarkup"""
+    if markup is None:
+        return []
+    return [button.callback_data for row in markup.inline_keyboard for button in row if button.callback_data]
+
+
+def make_context(bot: FakeBot, user_data: Optional[Dict] = None):
+    """Contexto mínimo; `user_data` se comparte entre las interacciones de un mismo usuario"""
+    return SimpleNamespace(bot=bot, user_data=user_data if user_data is not None else {},
+                           chat_data={}, bot_data={}, args=[])
@@ -0,0 +1,257 @@
+"""Prueba de carga del menú /constructores con N usuarios de Telegram simultáneos.
+
+Cada usuario abre el menú, registra una cuenta del clan, crea una construcción, lista sus
+constructores y la cancela, pulsando los mismos botones que un usuario real. Se mide la
+latencia de cada paso, las operaciones de base de datos por interacción y cuánto tiempo
+estuvo bloqueado el event loop.
+
+Uso:
+    python -m benchmarks.load_builders [--users 200] [--mongomock] [--think 0.2]
+        [--api-latency 0.05] [--telegram-latency 0.03]
+
+Sin --mongomock se usa el MongoDB de MONGO_DB_URI, en la base BENCH_MONGO_DB_NAME
+(friends_bot_bench por defecto), que se vacía al empezar.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from benchmarks.fixtures import make_players
+from benchmarks.harness import (
+    BENCH_CLAN_TAG,
+    FakeBot,
+    FakeCocServer,
+    callback_options,
+    configure_environment,
+    make_context,
+    make_update,
+    make_user,
+    percentile,
+    use_mongomock
+)
+
+
+class LoopLagMonitor:
+    """Mide el retraso del event loop: cuánto tarda en despertar un sleep de `interval`"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def blocked(self) -> float:
+        """Tiempo total en que el loop no pudo atender a tiempo (retrasos de más de 1 ms)"""
+        return sum(lag for lag in self.lags if lag > 0.001)
+
+
+class DbOpsCounter:
+    """Envuelve run_db para contar las idas a la base de datos de los DAO.
+
+    Además del total, cuenta las del paso en curso de cada usuario: cada usuario corre en
+    su propia tarea, así que el contador del paso vive en una ContextVar.
+    """
+
+    def __init__(self, run_db):
+        self._run_db = run_db
+        self.count = 0
+        self.step: ContextVar[Optional[List[int]]] = ContextVar("db_ops_step", default=None)
+
+    async def __call__(self, operation, func, *args, **kwargs):
+        self.count += 1
+        step = self.step.get()
+        if step is not None:
+            step[0] += 1
+        return await self._run_db(operation, func, *args, **kwargs)
+
+
+class SimulatedUser:
+    """Un usuario en chat privado que recorre el menú de constructores"""
+
+    def __init__(self, user_id: int, player: Dict, bot: FakeBot, handlers, stats, think: float):
+        self.user = make_user(user_id)
+        self.player = player
+        self.bot = bot
+        self.handlers = handlers
+        self.stats = stats
+        self.think = think
+        # user_data persiste entre updates del mismo usuario, como en python-telegram-bot
+        self.user_data: Dict = {}
+
+    async def _step(self, name: str, handler, text: str = "", callback_data: str = None):
+        if self.think:
+            await asyncio.sleep(random.uniform(0, self.think))
+        update = make_update(self.bot, text=text, user=self.user, callback_data=callback_data,
+                             chat_id=self.user.id, chat_type="private")
+        context = make_context(self.bot, self.user_data)
+        db_ops = [0]
+        self.stats.db.step.set(db_ops)
+
+        started = time.perf_counter()
+        await handler(update, context)
+        self.stats.latencies[name].append((time.perf_counter() - started) * 1000)
+        self.stats.db_ops[name].append(db_ops[0])
+
+    async def _press(self, name: str, data: str):
+        await self._step(name, self.handlers.route_callback(data), callback_data=data)
+
+    def _button(self, prefix: str) -> str:
+        options = [data for data in callback_options(self.bot.markups.get(self.user.id)) if data.startswith(prefix)]
+        if not options:
+            raise RuntimeError(f"Usuario {self.user.id}: no hay botón {prefix}")
+        return options[0]
+
+    async def run(self):
+        tag = self.player['tag']
+        handlers = self.handlers
+
+        await self._step("abrir menú", handlers.builders.constructores_handler, text="/constructores")
+        await self._press("añadir cuenta", "builders_add")
+        await self._step("enviar tag", handlers.builders.handle_text, text=tag)
+        await self._press("elegir constructores", "builder_count_3")
+
+        await self._step("abrir menú", handlers.builders.constructores_handler, text="/constructores")
+        await self._press("nueva construcción", "builders_build")
+        await self._press("elegir cuenta", f"build_account_{tag}")
+        await self._step("enviar duración", handlers.builders.handle_text, text="3h30m")
+        await self._step("enviar descripción", handlers.builders.handle_text, text="Mejora de muralla")
+
+        await self._step("abrir menú", handlers.builders.constructores_handler, text="/constructores")
+        await self._press("listar", "builders_list")
+        await self._press("cancelar", "builders_cancel")
+        await self._press("elegir cuenta a cancelar", f"cancel_account_{tag}")
+        await self._press("cancelar construcción", self._button("cancel_build_"))
+        await self._press("salir", "builders_exit")
+
+
+class Handlers:
+    """Reparte los callbacks como los CallbackQueryHandler de bot/handlers.py"""
+
+    def __init__(self, builders):
+        self.builders = builders
+        self.callback_routes = [
+            ("builders_", builders.handle_builder_callback),
+            ("builder_count_", builders.constructores_add),
+            ("build_account_", builders.constructores_build),
+            ("list_account_", builders.constructores_list),
+            ("cancel_account_", builders.constructores_cancel),
+            ("cancel_build_", builders.constructores_cancel)
+        ]
+
+    def route_callback(self, data: str):
+        for prefix, handler in self.callback_routes:
+            if data.startswith(prefix):
+                return handler
+        raise ValueError(f"Callback sin manejador: {data}")
+
+
+class Stats:
+    def __init__(self, db: DbOpsCounter):
+        self.db = db
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.db_ops: Dict[str, List[int]] = defaultdict(list)
+
+
+async def run_load(args, roster: List[Dict], fixtures: Dict[str, Dict]):
+    # Importaciones diferidas: config ya lee el entorno preparado para el benchmark
+    import data.dao.builders_dao as builders_dao_module
+    from bot.commands import builders
+    from bot.coc_client import coc_client
+    from config import MONGO_DB_BUILDERS_COLLECTION, MONGO_DB_BUILDER_PLAYERS_COLLECTION, MONGO_DB_BUILDS_COLLECTION
+    from database import get_collection, run_db
+
+    for name in (MONGO_DB_BUILDERS_COLLECTION, MONGO_DB_BUILDER_PLAYERS_COLLECTION, MONGO_DB_BUILDS_COLLECTION):
+        await run_db("reset", get_collection(name).delete_many, {})
+    await builders.builders_dao.sync_player_index()
+    await builders.builders_dao.migrate_builds()
+
+    server = FakeCocServer(fixtures, latency=args.api_latency)
+    server.start()
+    coc_client.base_url = server.url
+    bot = FakeBot(latency=args.telegram_latency)
+
+    db = DbOpsCounter(run_db)
+    builders_dao_module.run_db = db
+    stats = Stats(db)
+    handlers = Handlers(builders)
+    users = [
+        SimulatedUser(100000 + i, player, bot, handlers, stats, args.think)
+        for i, player in enumerate(roster)
+    ]
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(user.run() for user in users), return_exceptions=True)
+    finally:
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        builders_dao_module.run_db = run_db
+        await coc_client.close()
+        server.stop()
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    interactions = sum(len(samples) for samples in stats.latencies.values())
+    print(f"{len(users)} usuarios, {interactions} interacciones en {elapsed:.2f}s "
+          f"({interactions / elapsed:.0f}/s), {len(failures)} usuarios con error")
+    for failure in failures[:5]:
+        print(f"  error: {failure}")
+    print(f"\n{'paso':<26} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9} {'DB ops':>7}")
+    for name, samples in stats.latencies.items():
+        ops = stats.db_ops[name]
+        print(f"{name:<26} {percentile(samples, 50):>9.2f} {percentile(samples, 95):>9.2f} "
+              f"{max(samples):>9.2f} {sum(ops) / len(ops):>7.1f}")
+    print(f"\nDB ops por interacción: {db.count / max(1, interactions):.2f} "
+          f"| API CoC: {server.total_calls} | Telegram: {bot.total_calls}")
+    lags = [lag * 1000 for lag in monitor.lags]
+    print(f"Retraso del event loop: p50 {percentile(lags, 50):.2f} ms, p95 {percentile(lags, 95):.2f} ms, "
+          f"máx {max(lags, default=0):.2f} ms, bloqueado {monitor.blocked:.2f}s "
+          f"({monitor.blocked / elapsed * 100:.1f}% del total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--think", type=float, default=0.0, help="pausa aleatoria máxima entre pasos (s)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="segundos por petición a la API")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="segundos por llamada a Telegram")
+    parser.add_argument("--mongomock", action="store_true", help="usar mongomock (pip install -r requirements-dev.txt) en lugar de MongoDB")
+    args = parser.parse_args()
+
+    # Cada usuario registra un jugador distinto del clan
+    roster = make_players(random.Random(7), args.users)
+    fixtures = {
+        f"/clans/{BENCH_CLAN_TAG}/members": {
+            'items': [{**player, 'clanRank': rank} for rank, player in enumerate(roster, 1)]
+        }
+    }
+    configure_environment(BENCH_CLAN_TAG)
+    if args.mongomock:
+        use_mongomock()
+    asyncio.run(run_load(args, roster, fixtures))
+
+
+if __name__ == "__main__":
+    main()
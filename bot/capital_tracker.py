@@ -0,0 +1,135 @@
+import heapq
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+from telegram.ext import ContextTypes, JobQueue
+
+from bot.coc_client import coc_client
+from bot.utils import fetch_coc_data
+from config import CLAN_TAG
+
+logger = logging.getLogger(__name__)
+
+# Intervalos de consulta (segundos): durante el asalto y fuera de él
+RAID_INTERVAL = 120
+IDLE_INTERVAL = 1800
+
+
+class CapitalTracker:
+    """Mantiene en memoria la temporada de asalto actual aplicando solo los cambios de cada consulta"""
+
+    def __init__(self):
+        self.season: Optional[str] = None
+        self.state: Optional[str] = None
+        self.totals: Dict = {}
+        self.clan_members: Optional[int] = None
+        self.members: Dict[str, Dict] = {}
+        self.pending: Set[str] = set()  # tags que aún tienen ataques disponibles
+        self.last_defender: Optional[Dict] = None
+        self.updated_at: Optional[float] = None
+        self.interval: float = IDLE_INTERVAL
+        self._top: Optional[List[Dict]] = None
+        self._job_queue: Optional[JobQueue] = None
+
+    def start(self, job_queue: JobQueue, first: float = 5.0):
+        self._job_queue = job_queue
+        job_queue.run_once(self.poll, when=first, name="capital_tracker")
+
+    def is_fresh(self) -> bool:
+        """Si la foto sirve para /capital sin consultar la API.
+
+        Fuera de un asalto se consulta cada IDLE_INTERVAL: una foto sin asalto activo no se
+        da por buena para no ocultar durante hasta una hora un asalto recién empezado.
+        """
+        if self.updated_at is None or self.state != 'ongoing':
+            return False
+        return time.monotonic() - self.updated_at <= self.interval * 2
+
+    def _reset(self, season: str):
+        self.season = season
+        self.members.clear()
+        self.pending.clear()
+        self.last_defender = None
+        self._top = None
+
+    def apply(self, raid: Dict):
+        """Incorpora una respuesta de capitalraidseasons procesando solo lo que cambió"""
+        season = raid.get('startTime')
+        if season != self.season:
+            self._reset(season)
+
+        self.state = raid.get('state', 'unknown')
+        self.totals = {
+            'capitalTotalLoot': raid.get('capitalTotalLoot', 0),
+            'totalAttacks': raid.get('totalAttacks', 0),
+            'enemyDistrictsDestroyed': raid.get('enemyDistrictsDestroyed', 0),
+            'endTime': raid.get('endTime', '')
+        }
+
+        for member in raid.get('members', []):
+            tag = member['tag']
+            previous = self.members.get(tag)
+            # El ataque extra se desbloquea durante el asalto: cuenta como parte del límite
+            attack_limit = member.get('attackLimit', 5) + member.get('bonusAttackLimit', 0)
+            if (previous is not None
+                    and previous['attacks'] == member.get('attacks', 0)
+                    and previous['attackLimit'] == attack_limit
+                    and previous['capitalResourcesLooted'] == member.get('capitalResourcesLooted', 0)):
+                continue
+
+            entry = {
+                'name': member['name'],
+                'attacks': member.get('attacks', 0),
+                'attackLimit': attack_limit,
+                'capitalResourcesLooted': member.get('capitalResourcesLooted', 0)
+            }
+            self.members[tag] = entry
+            if entry['attacks'] < entry['attackLimit']:
+                self.pending.add(tag)
+            else:
+                self.pending.discard(tag)
+            self._top = None
+
+        # /capital solo muestra el último clan atacado; el attackLog llega con el más reciente primero
+        attack_log = raid.get('attackLog', [])
+        if attack_log:
+            self.last_defender = attack_log[0]['defender']
+
+        self.updated_at = time.monotonic()
+
+    def top_looters(self, n: int = 10) -> List[Dict]:
+        """Mejores recolectores; solo se recalcula si algún miembro cambió desde la última vez"""
+        if self._top is None or len(self._top) < min(n, len(self.members)):
+            self._top = heapq.nlargest(n, self.members.values(), key=lambda m: m['capitalResourcesLooted'])
+        return self._top[:n]
+
+    def inactive_members(self) -> List[Dict]:
+        return [member for tag, member in self.members.items() if tag in self.pending]
+
+    def members_with_attacks(self) -> int:
+        return sum(1 for m in self.members.values() if m['attacks'] > 0)
+
+    async def refresh(self) -> bool:
+        """Consulta la API y aplica los cambios; devuelve False si no hay datos"""
+        clan_data = await fetch_coc_data(f"/clans/{CLAN_TAG}")
+        raid_data = await coc_client.get(f"/clans/{CLAN_TAG}/capitalraidseasons?limit=1")
+        if not clan_data or not raid_data or not raid_data.get('items'):
+            return False
+        self.clan_members = clan_data.get("members")
+        self.apply(raid_data['items'][0])
+        self.interval = RAID_INTERVAL if self.state == 'ongoing' else IDLE_INTERVAL
+        return True
+
+    async def poll(self, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Error consultando el asalto a la capital: {e}")
+        finally:
+            if self._job_queue is not None:
+                self._job_queue.run_once(self.poll, when=self.interval, name="capital_tracker")
+
+
+# Instancia global compartida por el job y el comando /capital
+capital_tracker = CapitalTracker()
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from cachetools import TLRUCache
+
+from config import COC_CACHE_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def _cwl_war_ttl(payload: Dict[str, Any]) -> float:
+    # Una guerra de liga terminada ya no cambia nunca
+    return math.inf if payload.get('state') == 'warEnded' else 30
+
+
+# Reglas de frescura por endpoint: (patrón, segundos o función sobre el payload)
+ENDPOINT_TTLS = [
+    (re.compile(r"^/clanwarleagues/wars/"), _cwl_war_ttl),
+    (re.compile(r"/currentwar/leaguegroup$"), 300),
+    (re.compile(r"/currentwar$"), 30),
+    (re.compile(r"/capitalraidseasons"), 60),
+    (re.compile(r"/members$"), 300),
+    (re.compile(r"^/clans/[^/]+$"), 300),
+]
+
+
+class CocResponseCache:
+    """Caché TTL + LRU de respuestas de la API de CoC con agrupación de peticiones concurrentes.
+
+    Los payloads se comparten entre llamadas, por lo que deben tratarse como de solo lectura.
+    """
+
+    def __init__(self, maxsize: int = COC_CACHE_MAXSIZE, rules=None):
+        self.rules = rules if rules is not None else ENDPOINT_TTLS
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=time.monotonic)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def ttl_for(self, endpoint: str, payload: Dict[str, Any]) -> float:
+        """Segundos que una respuesta se considera fresca (0 = no se cachea)"""
+        for pattern, ttl in self.rules:
+            if pattern.search(endpoint):
+                return ttl(payload) if callable(ttl) else ttl
+        return 0
+
+    def _ttu(self, endpoint, payload, now):
+        return now + self.ttl_for(endpoint, payload)
+
+    async def get(self, endpoint: str, loader: Loader) -> Optional[Dict[str, Any]]:
+        """Devuelve la respuesta cacheada o la descarga una sola vez para todos los que la esperan"""
+        try:
+            return self._cache[endpoint]
+        except KeyError:
+            pass
+
+        future = self._inflight.get(endpoint)
+        if future is None:
+            future = asyncio.ensure_future(self._load(endpoint, loader))
+            self._inflight[endpoint] = future
+        # shield: si un llamador se cancela, la descarga sigue para el resto
+        return await asyncio.shield(future)
+
+    async def _load(self, endpoint: str, loader: Loader) -> Optional[Dict[str, Any]]:
+        try:
+            payload = await loader(endpoint)
+            if payload is not None:
+                self._cache[endpoint] = payload
+            return payload
+        finally:
+            self._inflight.pop(endpoint, None)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        if endpoint is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(endpoint, None)
+
+
+# Instancia global usada por fetch_coc_data
+coc_cache = CocResponseCache()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any
+
+import httpx
+
+from bot.metrics import COC_LATENCY, COC_REQUESTS, endpoint_label
+from config import (
+    COC_API_URL,
+    COC_HEADERS,
+    COC_REQUEST_TIMEOUT,
+    COC_MAX_CONCURRENCY,
+    COC_MAX_CONNECTIONS,
+    COC_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CocClient:
+    """Cliente asíncrono de la API de Clash of Clans con un pool de conexiones compartido"""
+
+    def __init__(
+            self,
+            base_url: str = COC_API_URL,
+            headers: Optional[Dict[str, str]] = None,
+            timeout: float = COC_REQUEST_TIMEOUT,
+            max_concurrency: int = COC_MAX_CONCURRENCY,
+            max_connections: int = COC_MAX_CONNECTIONS,
+            max_retries: int = COC_MAX_RETRIES
+    ):
+        self.base_url = base_url
+        self.headers = headers or COC_HEADERS
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        # Momento (monotonic) hasta el que la API nos pidió esperar tras un 429
+        self._throttled_until = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Crea el cliente HTTP de forma perezosa, dentro del event loop que lo usará"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _wait_if_throttled(self):
+        delay = self._throttled_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _register_throttle(self, response: httpx.Response) -> float:
+        """Registra un 429 para que todas las peticiones en curso esperen lo indicado"""
+        try:
+            retry_after = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            retry_after = 1.0
+        self._throttled_until = max(self._throttled_until, time.monotonic() + retry_after)
+        return retry_after
+
+    async def get(self, endpoint: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Consulta un endpoint de la API y devuelve el JSON, o None si falla"""
+        client = self._get_client()
+        label = endpoint_label(endpoint)
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_if_throttled()
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(endpoint, timeout=timeout or self.timeout)
+                    except httpx.HTTPError:
+                        COC_REQUESTS.labels(label, "error").inc()
+                        raise
+                    finally:
+                        COC_LATENCY.labels(label).observe(time.perf_counter() - started)
+                    COC_REQUESTS.labels(label, str(response.status_code)).inc()
+                    if response.status_code == 429 and attempt < self.max_retries:
+                        retry_after = self._register_throttle(response)
+                        logger.warning(f"Límite de la API COC alcanzado ({endpoint}), reintento en {retry_after}s")
+                        continue
+                response.raise_for_status()
+                return response.json()
+        except Exception as e:
+            logger.error(f"Error API COC ({endpoint}): {e}")
+            return None
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# Instancia global compartida por todos los comandos
+coc_client = CocClient()
@@ -12,6 +12,7 @@ from bot.utils import (
     format_time_left,
     fetch_coc_data
 )
+from bot.scheduler import build_scheduler
 from config import CLAN_TAG
 
 # Instancia global del DAO
@@ -306,7 +307,12 @@ async def constructores_add(update: Update, context: ContextTypes.DEFAULT_TYPE,
                     logger.error(f"Error al actualizar mensaje: {e}")
             
             context.user_data['builder_state'] = 'waiting_count'
-            context.user_data['account_data'] = account_data
+            # Solo lo necesario para registrar la cuenta; user_data se persiste
+            context.user_data['account_data'] = {
+                'tag': account_data['tag'],
+                'name': account_data['name'],
+                'townHallLevel': account_data['townHallLevel']
+            }
             return
 
     except Exception as e:
@@ -475,6 +481,16 @@ async def constructores_build(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
 
             if success:
+                # El DAO asigna el task_id; se agenda el aviso de fin
+                build_scheduler.add({
+                    "user_id": user_id,
+                    "username": user_data.get("username"),
+                    "player_tag": account_tag,
+                    "account_name": account_data["name"],
+                    "task_id": new_build["task_id"],
+                    "description": new_build["description"],
+                    "end_time": new_build["end_time"]
+                })
                 time_left = format_time_left(end_time.isoformat())
                 active_builds = len(account_data["active_builds"])
                 max_builders = account_data["max_builders"]
@@ -788,6 +804,7 @@ async def constructores_cancel(update: Update, context: ContextTypes.DEFAULT_TYP
                     )
 
                     if success:
+                        build_scheduler.cancel(task_id)
                         # Actualizar el mensaje con la confirmación y el menú principal
                         await query.message.edit_text(
                             f"🗑️ *Construcción cancelada exitosamente*\n\n"
@@ -1,8 +1,17 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
 from bot.utils import fetch_coc_data, send_to_topic
+from data.dao.members_dao import MembersDAO, SNAPSHOT_FIELDS
 from config import CLAN_TAG
 
+members_dao = MembersDAO()
+
+# Días que cubre el resumen de /historial
+HISTORY_DAYS = 7
+
 
 async def claninfo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     clan_data = await fetch_coc_data(f"/clans/{CLAN_TAG}")
@@ -25,24 +34,27 @@ async def claninfo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def miembros(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    members_data = await fetch_coc_data(f"/clans/{CLAN_TAG}/members")
-    if not members_data:
-        await update.message.reply_text("❌ Error obteniendo miembros")
-        return
+    # Se sirve desde la foto guardada por el job; solo se consulta la API si aún no existe
+    members = await members_dao.get_current_members()
+    if not members:
+        members_data = await fetch_coc_data(f"/clans/{CLAN_TAG}/members")
+        if not members_data:
+            await update.message.reply_text("❌ Error obteniendo miembros")
+            return
+        members = [
+            {"_id": m['tag'], **{key: m.get(field) for key, field in SNAPSHOT_FIELDS.items()}}
+            for m in members_data.get('items', [])
+        ]
 
-    top_donadores = sorted(
-        members_data.get('items', []),
-        key=lambda x: x.get('donations', 0),
-        reverse=True
-    )[:5]
+    top_donadores = heapq.nlargest(5, members, key=lambda x: x.get('donations') or 0)
 
     members_info = "\n".join(
-        f"{i + 1}. TH{m['townHallLevel']} {m['name']} [ {m['tag']} ]"
-        for i, m in enumerate(members_data.get('items', []))
+        f"{i + 1}. TH{m['th']} {m['name']} [ {m['_id']} ]"
+        for i, m in enumerate(members)
     )
 
     top_members_info = "\n".join(
-        f"{i + 1}. {(m['name'])}: 🎁 {m.get('donations', 0)} | 🏆 {m.get('trophies', 0)}"
+        f"{i + 1}. {(m['name'])}: 🎁 {m.get('donations') or 0} | 🏆 {m.get('trophies') or 0}"
         for i, m in enumerate(top_donadores)
     )
 
@@ -51,6 +63,34 @@ async def miembros(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"{members_info}\n\n"
         "🌟 *Top 5 Donadores*:\n"
         f"{top_members_info}\n\n"
-        f"👥 Total miembros: {len(members_data.get('items', []))}"
+        f"👥 Total miembros: {len(members)}"
+    )
+    await send_to_topic(message, update)
+
+
+async def historial(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Resumen semanal desde el historial de la foto de miembros: donaciones, altas y bajas"""
+    since = datetime.now() - timedelta(days=HISTORY_DAYS)
+    donations, movements = await asyncio.gather(
+        members_dao.get_donation_totals(since),
+        members_dao.get_membership_history(limit=10)
     )
-    await send_to_topic(message, update)
\ No newline at end of file
+
+    donations_info = "\n".join(
+        f"{i + 1}. {d['name']}: 🎁 {d['donations']}"
+        for i, d in enumerate(donations[:5])
+    ) or "Sin donaciones registradas"
+
+    movements_info = "\n".join(
+        f"{'➕' if event['type'] == 'join' else '➖'} {event['name']} [ {event['tag']} ] "
+        f"{event['at'].strftime('%d/%m %H:%M')}"
+        for event in movements
+    ) or "Sin altas ni bajas registradas"
+
+    message = (
+        f"🌟 *Top 5 Donadores (últimos {HISTORY_DAYS} días)*:\n"
+        f"{donations_info}\n\n"
+        "🚪 *Últimas altas y bajas*:\n"
+        f"{movements_info}"
+    )
+    await send_to_topic(message, update)
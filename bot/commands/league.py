@@ -1,10 +1,101 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from bot.utils import fetch_coc_data, send_to_topic, send_progress, update_progress, delete_progress, format_time_left, \
-    escape_markdown
-from config import CLAN_TAG
+from bot.utils import fetch_coc_data, send_to_topic, send_progress, update_progress, delete_progress, format_time_left
+from config import CLAN_TAG, COC_CWL_CONCURRENCY
+from data.dao.cwl_wars_dao import CwlWarsDAO
 import asyncio
 
+cwl_wars_dao = CwlWarsDAO()
+
+
+def compact_league_war(war_data):
+    """Reduce una guerra de liga a los campos que usa /liga"""
+    def compact_clan(clan):
+        return {
+            'tag': clan.get('tag'),
+            'name': clan.get('name'),
+            'stars': clan.get('stars', 0),
+            'destructionPercentage': clan.get('destructionPercentage', 0),
+            'members': [
+                {
+                    'tag': member.get('tag'),
+                    'name': member.get('name'),
+                    'townhallLevel': member.get('townhallLevel', 0),
+                    'attacks': [{'stars': a.get('stars', 0)} for a in member.get('attacks', [])]
+                }
+                for member in clan.get('members', [])
+            ]
+        }
+
+    return {
+        'state': war_data.get('state'),
+        'clan': compact_clan(war_data.get('clan') or {}),
+        'opponent': compact_clan(war_data.get('opponent') or {})
+    }
+
+
+async def fetch_league_wars(war_tags, max_concurrency: int = COC_CWL_CONCURRENCY):
+    """Entrega las guerras de liga: las terminadas desde MongoDB y el resto desde la API en paralelo"""
+    war_tags = [tag for tag in war_tags if tag != "#0"]
+    stored_wars = await cwl_wars_dao.get_ended_wars(war_tags)
+    for war_data in stored_wars.values():
+        yield war_data
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_war(war_tag):
+        async with semaphore:
+            war_data = await fetch_coc_data(f"/clanwarleagues/wars/{war_tag.replace('#', '%23')}")
+        if war_data and war_data.get('state') == 'warEnded':
+            await cwl_wars_dao.save_ended_war(war_tag, compact_league_war(war_data))
+        return war_data
+
+    pending = [fetch_war(tag) for tag in war_tags if tag not in stored_wars]
+    for future in asyncio.as_completed(pending):
+        yield await future
+
+
+def process_league_war(war_data, all_clans_stats, our_clan_mvps, our_clan_tag):
+    """Acumula las estadísticas de una guerra de liga en los totales"""
+    # Procesar ambos clanes (para el ranking global)
+    for clan in [war_data.get('clan'), war_data.get('opponent')]:
+        if not clan: continue
+
+        tag = clan.get('tag')
+        if tag not in all_clans_stats:
+            all_clans_stats[tag] = {
+                'name': clan.get('name'),
+                'stars': 0,
+                'destruction': 0,
+                'wins': 0
+            }
+
+        all_clans_stats[tag]['stars'] += clan.get('stars', 0)
+        all_clans_stats[tag]['destruction'] += clan.get('destructionPercentage', 0)
+
+        # Solo contar victorias si la guerra terminó
+        if war_data.get('state') == 'warEnded':
+            if clan.get('stars') > war_data.get('opponent', {}).get('stars', 0):
+                all_clans_stats[tag]['wins'] += 1
+            elif clan.get('stars') == war_data.get('opponent', {}).get('stars', 0):
+                if clan.get('destructionPercentage', 0) > war_data.get('opponent', {}).get('destructionPercentage',
+                                                                                           0):
+                    all_clans_stats[tag]['wins'] += 1
+
+        # Procesar solo los miembros de NUESTRO clan para MVP
+        if clan.get('tag') == our_clan_tag:
+            for member in clan.get('members', []):
+                player_tag = member.get('tag')
+                if player_tag not in our_clan_mvps:
+                    our_clan_mvps[player_tag] = {
+                        'name': member.get('name'),
+                        'stars': 0,
+                        'townhall': member.get('townhallLevel', 0)
+                    }
+
+                for attack in member.get('attacks', []):
+                    our_clan_mvps[player_tag]['stars'] += attack.get('stars', 0)
+
 
 async def liga(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra el ranking de clanes y los MVP de nuestro clan en la liga actual"""
@@ -48,51 +139,11 @@ async def liga(update: Update, context: ContextTypes.DEFAULT_TYPE):
     our_clan_tag = CLAN_TAG.replace('%23', '#')
 
     await update_progress(update, context, 80, "Analizando guerras")
-    for war_tag in war_tags:
-        if war_tag == "#0": continue
-
-        war_data = await fetch_coc_data(f"/clanwarleagues/wars/{war_tag.replace('#', '%23')}")
+    # Las guerras se piden en paralelo y se acumulan según van llegando
+    async for war_data in fetch_league_wars(war_tags):
         if not war_data or war_data.get('state') not in ['inWar', 'warEnded']:
             continue
-
-        # Procesar ambos clanes (para el ranking global)
-        for clan in [war_data.get('clan'), war_data.get('opponent')]:
-            if not clan: continue
-
-            tag = clan.get('tag')
-            if tag not in all_clans_stats:
-                all_clans_stats[tag] = {
-                    'name': clan.get('name'),
-                    'stars': 0,
-                    'destruction': 0,
-                    'wins': 0
-                }
-
-            all_clans_stats[tag]['stars'] += clan.get('stars', 0)
-            all_clans_stats[tag]['destruction'] += clan.get('destructionPercentage', 0)
-
-            # Solo contar victorias si la guerra terminó
-            if war_data.get('state') == 'warEnded':
-                if clan.get('stars') > war_data.get('opponent', {}).get('stars', 0):
-                    all_clans_stats[tag]['wins'] += 1
-                elif clan.get('stars') == war_data.get('opponent', {}).get('stars', 0):
-                    if clan.get('destructionPercentage', 0) > war_data.get('opponent', {}).get('destructionPercentage',
-                                                                                               0):
-                        all_clans_stats[tag]['wins'] += 1
-
-            # Procesar solo los miembros de NUESTRO clan para MVP
-            if clan.get('tag') == our_clan_tag:
-                for member in clan.get('members', []):
-                    player_tag = member.get('tag')
-                    if player_tag not in our_clan_mvps:
-                        our_clan_mvps[player_tag] = {
-                            'name': member.get('name'),
-                            'stars': 0,
-                            'townhall': member.get('townhallLevel', 0)
-                        }
-
-                    for attack in member.get('attacks', []):
-                        our_clan_mvps[player_tag]['stars'] += attack.get('stars', 0)
+        process_league_war(war_data, all_clans_stats, our_clan_mvps, our_clan_tag)
 
     await update_progress(update, context, 90, "Finalizando")
     message_parts = [
@@ -112,7 +163,7 @@ async def liga(update: Update, context: ContextTypes.DEFAULT_TYPE):
         for i, clan in enumerate(top_clans, 1):
             avg_destruction = clan['destruction'] / len(war_tags) if war_tags else 0
             message_parts.append(
-                f"{i}. {escape_markdown(clan['name'])}: "
+                f"{i}. {clan['name']}: "
                 f"⭐ {clan['stars']} | "
                 f"🔥 {avg_destruction:.1f}% | "
                 f"🏆 {clan['wins']}V"
@@ -132,11 +183,9 @@ async def liga(update: Update, context: ContextTypes.DEFAULT_TYPE):
         message_parts.append("\n👑 *TOP 10 MVP (NUESTRO CLAN)*:")
         for i, mvp in enumerate(sorted_mvps, 1):
             message_parts.append(
-                f"{i}. {escape_markdown(mvp['name'])} (TH{mvp['townhall']}) - "
+                f"{i}. {mvp['name']} (TH{mvp['townhall']}) - "
                 f"⭐ {mvp['stars']} estrellas"
             )
 
-    await update_progress(update, context, 100, "¡Completado!")
-    await asyncio.sleep(0.5)
     await delete_progress(context)
     await send_to_topic('\n'.join(message_parts), update)
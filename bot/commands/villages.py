@@ -2,6 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from data.dao.villages_dao import VillagesDAO
 from bot.utils import send_to_topic, send_to_topic_html
+from bot.send_queue import split_message, MAX_MESSAGE_LENGTH
 import logging
 
 from config import BOT_OWNER_USERNAME
@@ -17,32 +18,52 @@ ENTERING_DESCRIPTION = 3
 # Tipos de aldeas disponibles
 VILLAGE_TYPES = ["farming", "guerra", "todo"]
 
+# Lista de aldeas ya pintada, válida mientras no cambie la versión de la colección
+_rendered_villages = {"version": None, "body": ""}
+
+
+def render_villages(villages) -> str:
+    """Pinta la lista de aldeas (ya ordenadas por TH y tipo) agrupada por TH"""
+    lines = []
+    current_th = None
+    for village in villages:
+        if village["th_level"] != current_th:
+            if current_th is not None:
+                lines.append("")
+            current_th = village["th_level"]
+            lines.append(f"TH{current_th}:")
+        lines.append(f"<a href='{village['url']}'>{village['type'].capitalize()}</a> - {village['description']}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+async def get_rendered_villages(dao: VillagesDAO) -> str:
+    """Devuelve la lista pintada, reconstruyéndola solo si alguien agregó una aldea"""
+    version = await dao.get_version()
+    if version < 0 or version != _rendered_villages["version"]:
+        body = render_villages(await dao.get_all_villages())
+        if version >= 0:
+            _rendered_villages.update(version=version, body=body)
+        return body
+    return _rendered_villages["body"]
+
+
 async def aldeas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra la lista de aldeas disponibles"""
     dao = VillagesDAO()
-    villages = await dao.get_all_villages()
-    
-    if not villages:
+    body = await get_rendered_villages(dao)
+
+    if not body:
         await send_to_topic("No hay aldeas registradas aún.", update)
         return
-    
-    # Agrupar aldeas por TH
-    villages_by_th = {}
-    for village in villages:
-        if village.get("th_level") not in villages_by_th:
-            villages_by_th[village["th_level"]] = []
-        villages_by_th[village["th_level"]].append(village)
-    
-    # Construir mensaje
-    message = f"Hola {update.effective_user.first_name}, te comparto las mejores aldeas actualizadas por el líder del clan:\n\n"
-    
-    for th_level in sorted(villages_by_th.keys()):
-        message += f"TH{th_level}:\n"
-        for village in villages_by_th[th_level]:
-            message += f"<a href='{village['url']}'>{village['type'].capitalize()}</a> - {village['description']}\n"
-        message += "\n"
-    
-    await send_to_topic_html(message, update)
+
+    message = (
+        f"Hola {update.effective_user.first_name}, te comparto las mejores aldeas actualizadas por el líder del clan:\n\n"
+        f"{body}"
+    )
+
+    # Telegram no admite más de 4096 caracteres por mensaje
+    for chunk in split_message(message, MAX_MESSAGE_LENGTH):
+        await send_to_topic_html(chunk, update)
 
 async def agregar_aldea(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia el proceso de agregar una nueva aldea"""
@@ -139,6 +160,7 @@ async def description_received(update: Update, context: ContextTypes.DEFAULT_TYP
     )
     
     if success:
+        _rendered_villages["version"] = None
         await send_to_topic(
             f"✅ Nueva aldea agregada exitosamente:\n"
             f"TH{context.user_data['th_level']} - {context.user_data['village_type'].capitalize()}\n"
@@ -1,6 +1,9 @@
+import heapq
+from collections import defaultdict
 from telegram import Update
 from telegram.ext import ContextTypes
 from bot.utils import fetch_coc_data, send_to_topic, format_time_left
+from bot.war_tracker import war_tracker
 from config import CLAN_TAG
 
 
@@ -15,36 +18,24 @@ def calculate_attack_score(attack, attacker_th, defender_th, attacker_pos, defen
     return max(10, score)
 
 
-def get_missing_attackers(clan_members):
-    missing = []
-    for member in clan_members:
-        attacks = member.get('attacks', [])
-        if len(attacks) < 2:
-            remaining = 2 - len(attacks)
-            missing.append({
-                'name': member['name'],
-                'map_position': member['mapPosition'],
-                'th_level': member['townhallLevel'],
-                'remaining_attacks': remaining
-            })
-    return sorted(missing, key=lambda x: x['map_position'])
-
-
-async def guerra(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    war_data = await fetch_coc_data(f"/clans/{CLAN_TAG}/currentwar")
-    if not war_data or war_data.get('state') == 'notInWar':
-        await send_to_topic("⚔️ No hay guerra activa", update)
-        return
+def analyze_war(war_data, top_n=3):
+    """Calcula los mejores ataques, las mejores defensas y quién falta por atacar.
 
+    Función pura en tiempo lineal: los ataques rivales se indexan una sola vez por
+    defenderTag y cada miembro del clan se recorre una única vez.
+    """
     clan = war_data['clan']
     opponent = war_data['opponent']
-    team_size = war_data.get('teamSize', 15)
 
-    clan_members = {m['tag']: m for m in clan.get('members', [])}
     opponent_members = {m['tag']: m for m in opponent.get('members', [])}
+    defenses_by_defender = defaultdict(list)
+    for opp_member in opponent.get('members', []):
+        for defense in opp_member.get('attacks', []):
+            defenses_by_defender[defense['defenderTag']].append((opp_member, defense))
 
     attack_scores = []
     defense_scores = []
+    missing_attackers = []
 
     for member in clan.get('members', []):
         for attack in member.get('attacks', []):
@@ -67,24 +58,49 @@ async def guerra(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 'score': score
             })
 
-        defender_tag = member['tag']
-        for opp_member in opponent.get('members', []):
-            for defense in opp_member.get('attacks', []):
-                if defense['defenderTag'] == defender_tag:
-                    defense_scores.append({
-                        'defender': member['name'],
-                        'defender_th': member['townhallLevel'],
-                        'attacker': opp_member['name'],
-                        'attacker_th': opp_member['townhallLevel'],
-                        'stars_lost': defense['stars'],
-                        'destruction': defense['destructionPercentage'],
-                        'duration': defense['duration'],
-                        'score': 100 - defense['stars'] * 25
-                    })
-
-    top_attacks = sorted(attack_scores, key=lambda x: -x['score'])[:3]
-    top_defenses = sorted(defense_scores, key=lambda x: -x['score'])[:3]
-    missing_attackers = get_missing_attackers(clan.get('members', []))
+        for opp_member, defense in defenses_by_defender.get(member['tag'], ()):
+            defense_scores.append({
+                'defender': member['name'],
+                'defender_th': member['townhallLevel'],
+                'attacker': opp_member['name'],
+                'attacker_th': opp_member['townhallLevel'],
+                'stars_lost': defense['stars'],
+                'destruction': defense['destructionPercentage'],
+                'duration': defense['duration'],
+                'score': 100 - defense['stars'] * 25
+            })
+
+        attacks_done = len(member.get('attacks', []))
+        if attacks_done < 2:
+            missing_attackers.append({
+                'name': member['name'],
+                'map_position': member['mapPosition'],
+                'th_level': member['townhallLevel'],
+                'remaining_attacks': 2 - attacks_done
+            })
+
+    return {
+        'top_attacks': heapq.nlargest(top_n, attack_scores, key=lambda x: x['score']),
+        'top_defenses': heapq.nlargest(top_n, defense_scores, key=lambda x: x['score']),
+        'missing_attackers': sorted(missing_attackers, key=lambda x: x['map_position'])
+    }
+
+
+async def guerra(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # La foto del poller de guerra evita llamar a la API; si no está vigente, se consulta
+    war_data = war_tracker.get_snapshot() or await fetch_coc_data(f"/clans/{CLAN_TAG}/currentwar")
+    if not war_data or war_data.get('state') == 'notInWar':
+        await send_to_topic("⚔️ No hay guerra activa", update)
+        return
+
+    clan = war_data['clan']
+    opponent = war_data['opponent']
+    team_size = war_data.get('teamSize', 15)
+
+    analysis = analyze_war(war_data)
+    top_attacks = analysis['top_attacks']
+    top_defenses = analysis['top_defenses']
+    missing_attackers = analysis['missing_attackers']
 
     estado = 'Preparación' if war_data[
                                   'state'] == 'preparation' else f'En curso (Finaliza en {format_time_left(war_data.get("endTime"))})'
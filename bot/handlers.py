@@ -10,6 +10,7 @@ from bot.commands import (
 )
 
 from bot.utils import send_to_topic
+from config import STATE_TTL
 
 async def comandos(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra la lista de comandos disponibles"""
@@ -20,6 +21,7 @@ async def comandos(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ("/capital", "Progreso del fin de semana de ataque a la capital"),
         ("/liga", "Información de la liga de clanes actual"),
         ("/miembros", "Lista de miembros + Top 5 donadores del clan"),
+        ("/historial", "Donaciones de la última semana y últimas altas y bajas del clan"),
         ("/constructores", "Gestión de múltiples constructores para tu cuenta de Telegram"),
         ("/aldeas", "Lista de aldeas recomendadas por el líder del clan"),
         ("/agregarAldea", "Agregar una nueva aldea (solo líder del clan)")
@@ -39,6 +41,7 @@ def register_handlers(application: Application):
     application.add_handler(CommandHandler("capital", capital_commands.capital))
     application.add_handler(CommandHandler("liga", league_commands.liga))
     application.add_handler(CommandHandler("miembros", clan_commands.miembros))
+    application.add_handler(CommandHandler("historial", clan_commands.historial))
     
     # Comandos de constructores
     application.add_handler(CommandHandler("constructores", builders_commands.constructores_handler))
@@ -89,7 +92,11 @@ def register_handlers(application: Application):
                 MessageHandler(filters.TEXT & ~filters.COMMAND, villages_commands.description_received)
             ]
         },
-        fallbacks=[CommandHandler("cancel", villages_commands.cancel)]
+        fallbacks=[CommandHandler("cancel", villages_commands.cancel)],
+        # Sobrevive a reinicios del bot; si se abandona, caduca a las STATE_TTL segundos
+        name="agregar_aldea",
+        persistent=True,
+        conversation_timeout=STATE_TTL
     )
     application.add_handler(aldeas_conv_handler)
     
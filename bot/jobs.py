@@ -1,47 +1,59 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime
+from typing import Dict, List
 from telegram.ext import ContextTypes
-from bot.utils import load_constructores, save_constructores, send_to_topic, send_to_topic_html, fetch_data
+from bot.utils import notify_topic_html, fetch_coc_data
+from data.dao.builders_dao import BuildersDAO
+from data.dao.members_dao import MembersDAO
 import logging
 
-from config import URL_DOMAIN
+from config import CLAN_TAG
 
 logger = logging.getLogger(__name__)
 
-async def check_builders_notifications(context: ContextTypes.DEFAULT_TYPE):
-    try:
-        respuesta = await fetch_data(URL_DOMAIN)
-        logger.info(respuesta)
-        if respuesta:
-            data = load_constructores()
-            now = datetime.now()
-            modified = False
-
-            for user_id, user_data in data.items():
-                for tag, account in user_data.get("accounts", {}).items():
-                    builds_to_remove = []
-
-                    for idx, build in enumerate(account.get("active_builds", [])):
-                        end_time = datetime.fromisoformat(build["end_time"])
-                        time_left = end_time - now
-
-                        if timedelta(seconds=0) < time_left <= timedelta(minutes=1):
-                            try:
-                                logger.info(f"Notificando a {user_id}")
-                                await send_to_topic_html(
-                                    f"⏰ <a href='tg://user?id={user_id}'>"
-                                    f"{user_data['username']}</a>, tu construcción "
-                                    f"'{build['description']}' de la cuenta {account['name']} está por finalizar "
-                                    f"en 1 minuto."
-                                )
-                                builds_to_remove.append(idx)
-                                modified = True
-                            except Exception as e:
-                                logger.error(f"Error notificando: {e}")
-
-                    for idx in sorted(builds_to_remove, reverse=True):
-                        account["active_builds"].pop(idx)
-            if modified:
-                save_constructores(data)
-                logger.info("Registros de construcciones finalizadas eliminados")
-    except Exception as e:
-        logger.error(f"Error en check_builders_notifications: {e}")
\ No newline at end of file
+builders_dao = BuildersDAO()
+members_dao = MembersDAO()
+
+
+async def refresh_members_snapshot(context: ContextTypes.DEFAULT_TYPE):
+    """Actualiza la foto de miembros del clan en MongoDB"""
+    members_data = await fetch_coc_data(f"/clans/{CLAN_TAG}/members")
+    if not members_data:
+        return
+    changed = await members_dao.save_snapshot(members_data.get('items', []))
+    if changed:
+        logger.info(f"Foto de miembros actualizada ({changed} cambios)")
+
+
+async def notify_due_builds(context: ContextTypes.DEFAULT_TYPE, builds: List[Dict]):
+    """Avisa de las construcciones que terminan en 1 minuto y las elimina de la base de datos.
+
+    Cada construcción se borra solo cuando su aviso llegó a Telegram: si el bot se reinicia
+    antes de enviar el resumen, sigue pendiente y se vuelve a cargar al arrancar.
+    """
+    now = datetime.now()
+    finished, notified, deliveries = [], [], []
+    for build in builds:
+        if datetime.fromisoformat(build["end_time"]) > now:
+            logger.info(f"Notificando a {build['user_id']}")
+            notified.append(build)
+            deliveries.append(notify_topic_html(
+                f"⏰ <a href='tg://user?id={build['user_id']}'>"
+                f"{build['username']}</a>, tu construcción "
+                f"'{build['description']}' de la cuenta {build['account_name']} está por finalizar "
+                f"en 1 minuto.",
+                group="builds"
+            ))
+        else:
+            logger.info(f"Construcción {build['task_id']} ya finalizada, se elimina sin aviso")
+            finished.append(build)
+
+    # Esperar al envío del resumen (la ventana de agrupación) antes de borrar
+    for build, delivered in zip(notified, await asyncio.gather(*deliveries)):
+        if delivered:
+            finished.append(build)
+        else:
+            logger.error(f"No se pudo avisar de la construcción {build['task_id']}; queda pendiente")
+
+    removed = await builders_dao.remove_builder_tasks(finished)
+    logger.info(f"{removed} registros de construcciones finalizadas eliminados")
@@ -0,0 +1,70 @@
+import logging
+from typing import Optional
+
+import httpx
+from telegram.ext import ContextTypes, JobQueue
+
+from config import URL_DOMAIN, KEEP_ALIVE_INTERVAL, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class KeepAlivePinger:
+    """Hace ping a nuestro propio dominio para que el hosting no duerma el bot.
+
+    Va en su propio job: un ping lento nunca retrasa otro trabajo. Cada petición tiene un
+    timeout estricto y, si falla, el siguiente intento se aplaza el doble (hasta
+    `max_interval`) para no acumular peticiones contra un front-end caído.
+    """
+
+    def __init__(
+            self,
+            url: Optional[str] = URL_DOMAIN,
+            interval: float = KEEP_ALIVE_INTERVAL,
+            timeout: float = KEEP_ALIVE_TIMEOUT,
+            max_interval: float = KEEP_ALIVE_MAX_INTERVAL
+    ):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.max_interval = max_interval
+        self.failures = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._job_queue: Optional[JobQueue] = None
+
+    def start(self, job_queue: JobQueue, first: float = 10.0):
+        if not self.url:
+            logger.warning("URL_DOMAIN no configurado. Keep-alive desactivado")
+            return
+        self._job_queue = job_queue
+        job_queue.run_once(self.ping, when=first, name="keep_alive")
+
+    def next_interval(self) -> float:
+        if not self.failures:
+            return self.interval
+        return min(self.interval * 2 ** self.failures, self.max_interval)
+
+    async def ping(self, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout))
+            response = await self._client.get(self.url)
+            response.raise_for_status()
+            if self.failures:
+                logger.info(f"Keep-alive recuperado tras {self.failures} fallos")
+            self.failures = 0
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Keep-alive fallido ({self.failures}): {e!r}")
+        finally:
+            if self._job_queue is not None:
+                self._job_queue.run_once(self.ping, when=self.next_interval(), name="keep_alive")
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# Instancia global arrancada en post_init
+keep_alive_pinger = KeepAlivePinger()
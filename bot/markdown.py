@@ -0,0 +1,34 @@
+import re
+
+# Caracteres especiales de MarkdownV2
+_SPECIAL_CHARS = tuple('_*[]()~`>#+-=|{}.!')
+# Una barra invertida escapa el carácter siguiente, que se deja tal cual
+_ESCAPED_PAIR_RE = re.compile(r'(\\.)', re.DOTALL)
+
+
+class MarkdownV2(str):
+    """Texto ya escapado para MarkdownV2; escape_markdown lo devuelve sin tocar"""
+
+
+def _escape_plain(text: str) -> str:
+    # str.replace recorre el texto en C: bastante más rápido que translate o re.sub aquí
+    for char in _SPECIAL_CHARS:
+        if char in text:
+            text = text.replace(char, f'\\{char}')
+    return text
+
+
+def escape_markdown(text: str) -> MarkdownV2:
+    """Escapa los caracteres especiales de MarkdownV2.
+
+    Las secuencias `\\x` se respetan (el carácter ya viene escapado), igual que una
+    barra invertida final suelta. Un texto marcado como MarkdownV2 no se vuelve a escapar.
+    """
+    if isinstance(text, MarkdownV2):
+        return text
+    if '\\' not in text:
+        return MarkdownV2(_escape_plain(text))
+    # Los trozos impares del split son los pares `\x`, que se copian sin cambios
+    parts = _ESCAPED_PAIR_RE.split(text)
+    parts[::2] = [_escape_plain(part) for part in parts[::2]]
+    return MarkdownV2(''.join(parts))
@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import re
+import time
+from typing import Iterable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from telegram.ext import Application, BaseHandler, ConversationHandler
+
+from database import add_operation_observer
+
+# Los comandos lentos (/liga) tardan segundos; Mongo y el event loop, milisegundos
+HANDLER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_seconds", "Duración de los manejadores de Telegram", ["handler"], buckets=HANDLER_BUCKETS
+)
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Excepciones no controladas en los manejadores", ["handler"])
+COC_LATENCY = Histogram(
+    "coc_api_request_seconds", "Duración de las peticiones a la API de CoC", ["endpoint"], buckets=HANDLER_BUCKETS
+)
+COC_REQUESTS = Counter("coc_api_requests_total", "Peticiones a la API de CoC por resultado", ["endpoint", "status"])
+MONGO_LATENCY = Histogram(
+    "mongo_operation_seconds", "Duración de las operaciones de MongoDB por método del DAO", ["operation"],
+    buckets=FAST_BUCKETS
+)
+TELEGRAM_SENDS = Counter(
+    "telegram_send_total", "Envíos a Telegram por resultado (ok, retry_after, error)", ["result"]
+)
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Retraso del event loop al despertar", buckets=FAST_BUCKETS)
+LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Último retraso medido del event loop")
+WARMUP_DURATION = Gauge("bot_warmup_seconds", "Duración de cada paso del calentamiento al arrancar", ["step"])
+
+# Los tags de jugador, clan y guerra se agrupan para no crear una serie por tag
+_TAG_RE = re.compile(r'(%23|#)[0-9A-Z]+')
+
+
+def endpoint_label(endpoint: str) -> str:
+    """/clans/%23ABC/currentwar?x=1 -> /clans/{tag}/currentwar"""
+    return _TAG_RE.sub('{tag}', endpoint.split('?', 1)[0])
+
+
+def track_handler(callback):
+    """Decora un manejador de Telegram para medir su duración y sus errores"""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def _instrument(handlers: Iterable[BaseHandler]):
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            _instrument(handler.entry_points)
+            for state_handlers in handler.states.values():
+                _instrument(state_handlers)
+            _instrument(handler.fallbacks)
+        else:
+            handler.callback = track_handler(handler.callback)
+
+
+def instrument_application(application: Application):
+    """Mide todos los manejadores registrados, también los de dentro de las conversaciones"""
+    for handlers in application.handlers.values():
+        _instrument(handlers)
+
+
+def _observe_mongo(operation: str, seconds: float):
+    MONGO_LATENCY.labels(operation).observe(seconds)
+
+
+def instrument_database():
+    """Mide la duración de cada operación de MongoDB con el nombre que le da su DAO"""
+    add_operation_observer(_observe_mongo)
+
+
+def render_metrics():
+    """Cuerpo y content-type de la respuesta /metrics en formato de texto de Prometheus"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class LoopLagMonitor:
+    """Mide cada `interval` segundos cuánto tarda el event loop en despertar de un sleep"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Instancia global arrancada en post_init
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+from config import UPDATES_CONCURRENCY
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """Clave que serializa los updates: el usuario y, si no lo hay, el chat"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class OrderedApplication(Application):
+    """Application que procesa updates de usuarios distintos en paralelo y los de un mismo
+    usuario de uno en uno y en orden de llegada.
+
+    El estado del menú de constructores y las conversaciones viven en user_data, así que
+    dos updates del mismo usuario nunca deben solaparse. Se usa con concurrent_updates
+    activado: cada update llega en su propia tarea y aquí espera primero el turno de su
+    usuario (asyncio.Lock es FIFO) y después un hueco del límite global. Mientras un usuario
+    espera su turno no ocupa ninguno de los `UPDATES_CONCURRENCY` huecos.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._processing: Optional[asyncio.Semaphore] = None
+        self._key_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._key_users: Dict[Hashable, int] = {}
+
+    async def process_update(self, update: object) -> None:
+        if self._processing is None:
+            # Se crea dentro del event loop que procesa los updates
+            self._processing = asyncio.Semaphore(UPDATES_CONCURRENCY)
+        key = ordering_key(update)
+        if key is None:
+            async with self._processing:
+                await super().process_update(update)
+            return
+
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        self._key_users[key] = self._key_users.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._processing:
+                    await super().process_update(update)
+        finally:
+            # Sin más updates pendientes del usuario se libera su lock
+            self._key_users[key] -= 1
+            if not self._key_users[key]:
+                del self._key_users[key]
+                del self._key_locks[key]
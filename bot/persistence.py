@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+from telegram.ext import BasePersistence, ContextTypes, PersistenceInput
+
+from data.dao.bot_state_dao import BotStateDAO
+from config import STATE_TTL, STATE_UPDATE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Claves de user_data que hacen falta para retomar un flujo tras reiniciar el bot
+PERSISTED_USER_KEYS = (
+    # Menú /constructores
+    "active_menu",
+    "menu_message_id",
+    "builder_state",
+    "account_data",
+    "selected_account",
+    "duration",
+    # Conversación /agregarAldea
+    "th_level",
+    "village_type",
+    "url"
+)
+
+
+def compact_user_data(data: Dict) -> Dict:
+    """Solo las claves de estado de los flujos; el resto no se guarda"""
+    return {key: data[key] for key in PERSISTED_USER_KEYS if key in data}
+
+
+class MongoPersistence(BasePersistence):
+    """Persistencia en MongoDB del estado mínimo de los usuarios y las conversaciones.
+
+    El Application entrega los cambios cada `update_interval` segundos; aquí se acumulan y
+    se escriben juntos en un único bulk_write, y solo los usuarios cuyo estado cambió.
+    Las sesiones abandonadas caducan a los `ttl` segundos: en MongoDB con un índice TTL y
+    en memoria con el job `expire_idle_users`.
+
+    Una conversación recuperada tras reiniciar no recibe un nuevo job de conversation_timeout:
+    PTB solo lo programa al cambiar de estado dentro del proceso. Por eso al arrancar solo se
+    recuperan los estados que cambiaron hace menos de `ttl` segundos; uno más viejo ya habría
+    caducado y no se restaura. Los recuperados siguen abiertos hasta que el usuario termine
+    la conversación o la cancele, o hasta el siguiente reinicio.
+    """
+
+    def __init__(self, dao: Optional[BotStateDAO] = None, update_interval: float = STATE_UPDATE_INTERVAL,
+                 ttl: float = STATE_TTL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.dao = dao or BotStateDAO()
+        self.ttl = ttl
+        self._saved_users: Dict[int, Dict] = {}  # última versión guardada de cada usuario
+        self._last_seen: Dict[int, float] = {}
+        self._pending_users: Dict[int, Optional[Dict]] = {}
+        self._pending_conversations: Dict[Tuple[str, Tuple[Hashable, ...]], object] = {}
+        self._write_task: Optional[asyncio.Task] = None
+
+    async def get_user_data(self) -> Dict[int, Dict]:
+        await self.dao.ensure_indexes(self.ttl)
+        users = await self.dao.get_user_data(max_age=self.ttl)
+        now = time.monotonic()
+        for user_id, data in users.items():
+            self._saved_users[user_id] = data
+            self._last_seen[user_id] = now
+        return {user_id: dict(data) for user_id, data in users.items()}
+
+    async def get_chat_data(self) -> Dict[int, Dict]:
+        return {}
+
+    async def get_bot_data(self) -> Dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> Dict:
+        return await self.dao.get_conversations(name, max_age=self.ttl)
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]):
+        self._pending_conversations[(name, key)] = new_state
+        self._schedule_write()
+
+    async def update_user_data(self, user_id: int, data: Dict):
+        self._last_seen[user_id] = time.monotonic()
+        compact = compact_user_data(data)
+        if compact == self._saved_users.get(user_id, {}):
+            return
+        self._saved_users[user_id] = compact
+        self._pending_users[user_id] = compact
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int):
+        self._last_seen.pop(user_id, None)
+        if self._saved_users.pop(user_id, None) is not None:
+            self._pending_users[user_id] = None
+            self._schedule_write()
+
+    async def update_chat_data(self, chat_id: int, data: Dict):
+        pass
+
+    async def update_bot_data(self, data: Dict):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict):
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict):
+        pass
+
+    def _schedule_write(self):
+        # El Application llama a update_* de todos los usuarios seguidos: se escribe al terminar
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        await asyncio.sleep(0)
+        users, self._pending_users = self._pending_users, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        if not await self.dao.save(users, conversations):
+            # Se reintentará en la siguiente pasada sin pisar cambios más recientes
+            for user_id, data in users.items():
+                self._pending_users.setdefault(user_id, data)
+            for key, state in conversations.items():
+                self._pending_conversations.setdefault(key, state)
+
+    async def flush(self):
+        if self._write_task is not None and not self._write_task.done():
+            await self._write_task
+        if self._pending_users or self._pending_conversations:
+            await self._write_pending()
+
+    async def expire_idle_users(self, context: ContextTypes.DEFAULT_TYPE):
+        """Libera de memoria el user_data de los usuarios sin actividad en `ttl` segundos"""
+        deadline = time.monotonic() - self.ttl
+        idle = [user_id for user_id, seen in self._last_seen.items() if seen < deadline]
+        for user_id in idle:
+            context.application.drop_user_data(user_id)
+            self._last_seen.pop(user_id, None)
+        if idle:
+            logger.info(f"{len(idle)} sesiones inactivas liberadas")
@@ -0,0 +1,99 @@
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Callable, Awaitable
+
+from telegram.ext import ContextTypes, JobQueue, Job
+
+logger = logging.getLogger(__name__)
+
+# Antelación con la que se avisa del fin de una construcción
+NOTICE_BEFORE = timedelta(minutes=1)
+
+DueCallback = Callable[[ContextTypes.DEFAULT_TYPE, List[Dict]], Awaitable[None]]
+
+
+class BuildScheduler:
+    """Planifica los avisos de fin de construcción con un min-heap y un único job run_once.
+
+    Solo hay un job programado a la vez: el del próximo aviso. Al despertar se atienden
+    todas las construcciones vencidas y se reprograma para la siguiente.
+    """
+
+    def __init__(self, notice_before: timedelta = NOTICE_BEFORE):
+        self.notice_before = notice_before
+        self._heap = []  # (notify_at, task_id)
+        self._builds: Dict[str, Dict] = {}  # task_id -> construcción pendiente
+        self._job_queue: Optional[JobQueue] = None
+        self._on_due: Optional[DueCallback] = None
+        self._job: Optional[Job] = None
+        self._wake_at: Optional[datetime] = None
+
+    async def start(self, job_queue: JobQueue, on_due: DueCallback, builds: List[Dict]):
+        """Carga las construcciones pendientes y programa el primer aviso"""
+        self._job_queue = job_queue
+        self._on_due = on_due
+        for build in builds:
+            self._push(build)
+        logger.info(f"Planificador de construcciones iniciado con {len(self._builds)} pendientes")
+        self._schedule_next()
+
+    def add(self, build: Dict):
+        """Registra una construcción nueva (debe incluir task_id y end_time)"""
+        self._push(build)
+        self._schedule_next()
+
+    def cancel(self, task_id: str):
+        """Olvida una construcción; su entrada del heap se descarta al llegar a la cima"""
+        self._builds.pop(task_id, None)
+
+    def __len__(self):
+        return len(self._builds)
+
+    def _push(self, build: Dict):
+        task_id = build.get("task_id")
+        if not task_id:
+            return
+        end_time = datetime.fromisoformat(build["end_time"])
+        self._builds[task_id] = build
+        heapq.heappush(self._heap, (end_time - self.notice_before, task_id))
+
+    def _schedule_next(self):
+        # Descartar de la cima las construcciones canceladas
+        while self._heap and self._heap[0][1] not in self._builds:
+            heapq.heappop(self._heap)
+        if not self._heap or self._job_queue is None:
+            return
+
+        notify_at = self._heap[0][0]
+        if self._job is not None:
+            if self._wake_at <= notify_at:
+                return
+            self._job.schedule_removal()
+
+        delay = max(0.0, (notify_at - datetime.now()).total_seconds())
+        self._job = self._job_queue.run_once(self._wake, when=delay, name="builds_scheduler")
+        self._wake_at = notify_at
+
+    async def _wake(self, context: ContextTypes.DEFAULT_TYPE):
+        self._job = None
+        self._wake_at = None
+        now = datetime.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id = heapq.heappop(self._heap)
+            build = self._builds.pop(task_id, None)
+            if build:
+                due.append(build)
+
+        try:
+            if due:
+                await self._on_due(context, due)
+        except Exception as e:
+            logger.error(f"Error atendiendo construcciones vencidas: {e}")
+        finally:
+            self._schedule_next()
+
+
+# Instancia global compartida por los comandos y los jobs
+build_scheduler = BuildScheduler()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Bot, Message
+from telegram.error import RetryAfter
+
+from bot.metrics import TELEGRAM_SENDS
+from config import TELEGRAM_CHAT_RATE_PER_MINUTE, TELEGRAM_DIGEST_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Límite de longitud de un mensaje de Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """Cubeta de tokens: `rate` envíos por segundo con ráfagas de hasta `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Consume un token y devuelve cuántos segundos hay que esperar para usarlo"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SendQueue:
+    """Cola de salida hacia Telegram con límite por chat, reintentos tras 429 y resúmenes.
+
+    Cada chat tiene su propia cola y cubeta; los avisos de un mismo `group` enviados con
+    `notify` dentro de la misma ventana se agrupan en un único mensaje.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            rate_per_minute: int = TELEGRAM_CHAT_RATE_PER_MINUTE,
+            digest_window: float = TELEGRAM_DIGEST_WINDOW,
+            max_retries: int = 3
+    ):
+        self.bot = bot
+        self.rate_per_minute = rate_per_minute
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._digests: Dict[Tuple, List[str]] = {}
+        self._digest_waiters: Dict[Tuple, List[asyncio.Future]] = {}
+
+    async def send(self, chat_id: int, text: str, **kwargs) -> Message:
+        """Encola un mensaje y espera a que se entregue"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue(chat_id).put_nowait((dict(chat_id=chat_id, text=text, **kwargs), future))
+        self._ensure_worker(chat_id)
+        return await future
+
+    def notify(self, chat_id: int, text: str, group: str = "default", **kwargs) -> asyncio.Future:
+        """Encola un aviso que se agrupa con los avisos del mismo `group` de la ventana actual.
+
+        Devuelve un future que se resuelve a True cuando el resumen que lo incluye se entregó
+        entero, o a False si falló algún trozo.
+        """
+        loop = asyncio.get_running_loop()
+        key = (chat_id, group, tuple(sorted(kwargs.items())))
+        if key not in self._digests:
+            self._digests[key] = []
+            self._digest_waiters[key] = []
+            loop.call_later(self.digest_window, self._flush_digest, key)
+        self._digests[key].append(text)
+        delivered = loop.create_future()
+        self._digest_waiters[key].append(delivered)
+        return delivered
+
+    def _flush_digest(self, key: Tuple):
+        texts = self._digests.pop(key, [])
+        waiters = self._digest_waiters.pop(key, [])
+        chat_id, kwargs = key[0], dict(key[2])
+        chunks = []
+        for chunk in split_message("\n\n".join(texts)):
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(_log_failure)
+            self._queue(chat_id).put_nowait((dict(chat_id=chat_id, text=chunk, **kwargs), future))
+            chunks.append(future)
+        self._ensure_worker(chat_id)
+        asyncio.gather(*chunks, return_exceptions=True).add_done_callback(
+            lambda results: _resolve_waiters(waiters, results)
+        )
+
+    def _queue(self, chat_id: int) -> asyncio.Queue:
+        if chat_id not in self._queues:
+            self._queues[chat_id] = asyncio.Queue()
+            self._buckets[chat_id] = TokenBucket(
+                rate=self.rate_per_minute / 60,
+                capacity=max(1, self.rate_per_minute // 6)
+            )
+        return self._queues[chat_id]
+
+    def _ensure_worker(self, chat_id: int):
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+
+    async def _worker(self, chat_id: int):
+        queue = self._queues[chat_id]
+        bucket = self._buckets[chat_id]
+        # Sin await entre la comprobación y la salida: no se pierden mensajes encolados
+        while not queue.empty():
+            kwargs, future = queue.get_nowait()
+            delay = bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                future.set_result(await self._deliver(kwargs))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _deliver(self, kwargs: Dict) -> Message:
+        for attempt in range(self.max_retries + 1):
+            try:
+                message = await self.bot.send_message(**kwargs)
+                TELEGRAM_SENDS.labels("ok").inc()
+                return message
+            except RetryAfter as e:
+                TELEGRAM_SENDS.labels("retry_after").inc()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Telegram pidió esperar {e.retry_after}s (chat {kwargs['chat_id']})")
+                await asyncio.sleep(e.retry_after)
+            except Exception:
+                TELEGRAM_SENDS.labels("error").inc()
+                raise
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Parte un texto en trozos de como mucho `limit` caracteres, cortando por líneas"""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _resolve_waiters(waiters: List[asyncio.Future], results: asyncio.Future):
+    delivered = not results.cancelled() and not any(isinstance(r, BaseException) for r in results.result())
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_result(delivered)
+
+
+def _log_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception():
+        logger.error(f"Error enviando resumen de avisos: {future.exception()}")
@@ -1,72 +1,28 @@
+import asyncio
 import logging
-from bson import ObjectId
+import time
 from typing import Optional, Dict, Any
-import requests
 from telegram import Update, Bot
+from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
 from datetime import datetime, timedelta
-from database import get_collection
+from bot.coc_client import coc_client
+from bot.coc_cache import coc_cache
+from bot.markdown import escape_markdown
+from bot.send_queue import SendQueue
 
-from config import COC_API_URL, COC_HEADERS, TELEGRAM_TOKEN, ALLOWED_GROUP_ID, ALERTAS_TOPIC_ID, MONGO_DB_BUILDERS_COLLECTION
+from config import TELEGRAM_TOKEN, ALLOWED_GROUP_ID, ALERTAS_TOPIC_ID, PROGRESS_THRESHOLD, PROGRESS_EDIT_INTERVAL
 
 logger = logging.getLogger(__name__)
 TELEGRAM_BOT = Bot(token=TELEGRAM_TOKEN)
+# Todos los envíos al grupo pasan por esta cola para respetar el límite de Telegram
+send_queue = SendQueue(TELEGRAM_BOT)
 
 # API Helpers
 
-async def fetch_data(url: str):
-    try:
-        logger.info(url)
-        response = requests.get(url)
-        return response
-    except Exception as e:
-        logger.error(f"Error consulta http: {e}")
-        return None
-
-
 async def fetch_coc_data(endpoint: str) -> Optional[Dict[str, Any]]:
-    try:
-        response = requests.get(
-            f"{COC_API_URL}{endpoint}",
-            headers=COC_HEADERS,
-            timeout=15
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"Error API COC ({endpoint}): {e}")
-        return None
-
-
-# Builder Helpers
-def load_constructores() -> dict:
-    try:
-        collection = get_collection(MONGO_DB_BUILDERS_COLLECTION)
-        result = {}
-        for doc in collection.find():
-            result[str(doc["_id"])] = doc["data"]
-        return result
-    except Exception as e:
-        logger.error(f"Error cargando constructores: {e}")
-        return {}
-
-
-def save_constructores(data: dict) -> bool:
-    try:
-        collection = get_collection(MONGO_DB_BUILDERS_COLLECTION)
-        # Eliminamos todos los documentos existentes (simulamos el overwrite del JSON)
-        collection.delete_many({})
-
-        # Insertamos los nuevos datos
-        for user_id, user_data in data.items():
-            collection.insert_one({
-                "_id": ObjectId(user_id) if len(user_id) == 24 else user_id,
-                "data": user_data
-            })
-        return True
-    except Exception as e:
-        logger.error(f"Error guardando constructores: {e}")
-        return False
+    """Consulta la API de CoC pasando por la caché de respuestas"""
+    return await coc_cache.get(endpoint, coc_client.get)
 
 
 # Format Helpers
@@ -114,7 +70,7 @@ async def send_to_topic(text: str, update: Optional[Update] = None):
             await update.message.reply_text("Usted no está autorizado para consumir información de Friends.")
             return
 
-        await TELEGRAM_BOT.send_message(
+        await send_queue.send(
             chat_id=ALLOWED_GROUP_ID,
             text=escape_markdown(text),
             message_thread_id=ALERTAS_TOPIC_ID,
@@ -128,11 +84,22 @@ async def send_to_topic(text: str, update: Optional[Update] = None):
         return False
 
 
-async def send_to_topic_html(text: str, update: Optional[Update] = None):
-    """Envía mensaje al tópico designado"""
+def notify_topic_html(text: str, group: str, chat_id: int = ALLOWED_GROUP_ID) -> asyncio.Future:
+    """Aviso al tópico agrupado con los avisos cercanos del mismo `group`.
+
+    El future devuelto se resuelve a True cuando el aviso llegó a Telegram y a False si no.
+    """
+    return send_queue.notify(chat_id, text, group=group, message_thread_id=ALERTAS_TOPIC_ID, parse_mode="HTML")
+
+
+async def send_to_topic_html(text: str, update: Optional[Update] = None, digest: Optional[str] = None):
+    """Envía mensaje al tópico designado; con `digest` se agrupa con los avisos cercanos del mismo tipo"""
     try:
         chat_id = update.effective_chat.id if update else ALLOWED_GROUP_ID
-        await TELEGRAM_BOT.send_message(
+        if digest:
+            notify_topic_html(text, digest, chat_id)
+            return True
+        await send_queue.send(
             chat_id=chat_id,
             text=text,
             message_thread_id=ALERTAS_TOPIC_ID,
@@ -146,51 +113,88 @@ async def send_to_topic_html(text: str, update: Optional[Update] = None):
         return False
 
 
-def escape_markdown(text: str) -> str:
-    escape_chars = '_*[]()~`>#+-=|{}.!'
-    result = []
-    i = 0
-    while i < len(text):
-        if text[i] == '\\' and i + 1 < len(text):
-            result.append(f'\\{text[i + 1]}')
-            i += 2
-        elif text[i] in escape_chars:
-            result.append(f'\\{text[i]}')
-            i += 1
-        else:
-            result.append(text[i])
-            i += 1
-    return ''.join(result)
+class ProgressIndicator:
+    """Mensaje de progreso diferido: solo se muestra si el trabajo supera `threshold` segundos.
+
+    Mientras tanto basta con la acción "escribiendo..." del chat. Las ediciones posteriores
+    se limitan a una cada `min_interval` segundos para no gastar el límite del grupo.
+    """
+
+    def __init__(self, update: Update, threshold: float = PROGRESS_THRESHOLD,
+                 min_interval: float = PROGRESS_EDIT_INTERVAL):
+        self.update = update
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.text = ""
+        self.message = None
+        self.last_edit = 0.0
+        self._sending = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, text: str):
+        self.text = text
+        self._task = asyncio.create_task(self._show_later())
+
+    async def _show_later(self):
+        try:
+            await self.update.effective_chat.send_action(ChatAction.TYPING)
+        except Exception as e:
+            logger.error(f"Error enviando acción de chat: {e}")
+        await asyncio.sleep(self.threshold)
+        self._sending = True
+        try:
+            self.message = await self.update.message.reply_text(self.text)
+            self.last_edit = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error en progreso: {e}")
+
+    async def set(self, text: str):
+        self.text = text
+        if self.message is None or time.monotonic() - self.last_edit < self.min_interval:
+            return
+        try:
+            await self.message.edit_text(text)
+            self.last_edit = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error actualizando progreso: {e}")
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            if self._sending:
+                # El mensaje ya va en camino: esperar para poder borrarlo
+                await self._task
+            else:
+                self._task.cancel()
+        if self.message is not None:
+            try:
+                await self.message.delete()
+            except Exception:
+                pass
+
+
+def _progress_text(message: str, percentage: int) -> str:
+    bars = "▰" * (percentage // 20) + "▱" * (5 - percentage // 20)
+    return f"🔄 {message} {bars} {percentage}%"
 
 
 async def send_progress(update: Update, context: ContextTypes.DEFAULT_TYPE, message: str = ""):
-    """Envía/actualiza un mensaje de progreso animado"""
-    try:
-        if not hasattr(context, 'progress_message'):
-            context.progress_message = await update.message.reply_text(f"🔄 {message} ▰▱▱▱▱ 0%")
-        else:
-            await context.progress_message.edit_text(f"🔄 {message} ▰▱▱▱▱ 0%")
-    except Exception as e:
-        logger.error(f"Error en progreso: {e}")
+    """Inicia el indicador de progreso (solo visible si la respuesta tarda)"""
+    if not hasattr(context, 'progress_message'):
+        context.progress_message = ProgressIndicator(update)
+        context.progress_message.start(_progress_text(message, 0))
+    else:
+        await context.progress_message.set(_progress_text(message, 0))
 
 
 async def update_progress(update: Update, context: ContextTypes.DEFAULT_TYPE, percentage: int, message: str = ""):
     """Actualiza la barra de progreso"""
     if not hasattr(context, 'progress_message'):
         return
-
-    bars = "▰" * (percentage // 20) + "▱" * (5 - percentage // 20)
-    try:
-        await context.progress_message.edit_text(f"🔄 {message} {bars} {percentage}%")
-    except Exception as e:
-        logger.error(f"Error actualizando progreso: {e}")
+    await context.progress_message.set(_progress_text(message, percentage))
 
 
 async def delete_progress(context: ContextTypes.DEFAULT_TYPE):
-    """Elimina el mensaje de progreso"""
+    """Elimina el indicador de progreso"""
     if hasattr(context, 'progress_message'):
-        try:
-            await context.progress_message.delete()
-        except:
-            pass
+        await context.progress_message.close()
         del context.progress_message
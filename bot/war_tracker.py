@@ -0,0 +1,150 @@
+import html
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from telegram.ext import ContextTypes, JobQueue
+
+from bot.coc_client import coc_client
+from bot.utils import send_to_topic_html
+from config import CLAN_TAG
+
+logger = logging.getLogger(__name__)
+
+# Intervalos de consulta (segundos) según el estado de la guerra
+IDLE_INTERVAL = 600
+PREPARATION_INTERVAL = 300
+WAR_INTERVAL = 120
+FINAL_HOURS_INTERVAL = 60
+LAST_MINUTES_INTERVAL = 30
+
+
+def parse_coc_time(value: str) -> datetime:
+    """Convierte una fecha de la API de CoC (20240101T120000.000Z) a datetime con zona"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def next_interval(war_data: Optional[Dict]) -> float:
+    """Segundos hasta la próxima consulta: lento en preparación, rápido cerca del final"""
+    if not war_data:
+        return IDLE_INTERVAL
+    state = war_data.get('state')
+    if state == 'preparation':
+        start = war_data.get('startTime')
+        if start:
+            until_start = (parse_coc_time(start) - datetime.now(timezone.utc)).total_seconds()
+            return max(LAST_MINUTES_INTERVAL, min(PREPARATION_INTERVAL, until_start))
+        return PREPARATION_INTERVAL
+    if state != 'inWar':
+        return IDLE_INTERVAL
+
+    end = war_data.get('endTime')
+    if not end:
+        return WAR_INTERVAL
+    remaining = (parse_coc_time(end) - datetime.now(timezone.utc)).total_seconds()
+    if remaining <= 15 * 60:
+        return LAST_MINUTES_INTERVAL
+    if remaining <= 2 * 3600:
+        return FINAL_HOURS_INTERVAL
+    return WAR_INTERVAL
+
+
+def war_id(war_data: Dict) -> str:
+    return f"{war_data.get('preparationStartTime')}|{war_data.get('opponent', {}).get('tag')}"
+
+
+def collect_attacks(war_data: Dict) -> Dict[int, Dict]:
+    """Indexa todos los ataques de la guerra (nuestros y rivales) por su `order`"""
+    clan = war_data.get('clan', {})
+    opponent = war_data.get('opponent', {})
+    members = {m['tag']: m for m in clan.get('members', []) + opponent.get('members', [])}
+
+    attacks = {}
+    for side, is_ours in ((clan, True), (opponent, False)):
+        for member in side.get('members', []):
+            for attack in member.get('attacks', []):
+                attacks[attack['order']] = {
+                    'ours': is_ours,
+                    'attacker': member,
+                    'defender': members.get(attack['defenderTag'], {}),
+                    'attack': attack
+                }
+    return attacks
+
+
+def format_attack(entry: Dict) -> str:
+    attack = entry['attack']
+    attacker = entry['attacker']
+    defender = entry['defender']
+    stars = '★' * attack['stars'] + '☆' * (3 - attack['stars'])
+    attacker_name = html.escape(attacker.get('name', '?'))
+    defender_name = html.escape(defender.get('name', '?'))
+    if entry['ours']:
+        return (f"⚔️ {attacker_name} (TH{attacker.get('townhallLevel', '?')}) → "
+                f"{defender_name} (TH{defender.get('townhallLevel', '?')}): "
+                f"{stars} {attack['destructionPercentage']}%")
+    return (f"🛡️ {defender_name} (TH{defender.get('townhallLevel', '?')}) ← "
+            f"{attacker_name} (TH{attacker.get('townhallLevel', '?')}): "
+            f"{stars} {attack['destructionPercentage']}%")
+
+
+class WarTracker:
+    """Consulta periódicamente la guerra actual, avisa de los ataques nuevos y guarda la última foto"""
+
+    def __init__(self):
+        self.snapshot: Optional[Dict] = None
+        self.fetched_at: Optional[float] = None
+        self.interval: float = IDLE_INTERVAL
+        self._war_id: Optional[str] = None
+        self._seen_orders: Set[int] = set()
+        self._job_queue: Optional[JobQueue] = None
+
+    def start(self, job_queue: JobQueue, first: float = 5.0):
+        self._job_queue = job_queue
+        job_queue.run_once(self.poll, when=first, name="war_tracker")
+
+    def get_snapshot(self) -> Optional[Dict]:
+        """Devuelve la última foto de la guerra si aún es vigente (None si no hay o está vieja)"""
+        if self.snapshot is None or self.fetched_at is None:
+            return None
+        # Sin guerra se consulta en cada intervalo largo; mejor no ocultar una guerra recién empezada
+        if self.snapshot.get('state') == 'notInWar':
+            return None
+        if time.monotonic() - self.fetched_at > self.interval * 2:
+            return None
+        return self.snapshot
+
+    def apply(self, war_data: Dict) -> List[Dict]:
+        """Actualiza la foto y devuelve los ataques que no se habían visto"""
+        attacks = collect_attacks(war_data) if war_data.get('state') in ('inWar', 'warEnded') else {}
+        current_war = war_id(war_data)
+        first_look = self.snapshot is None or current_war != self._war_id
+
+        new_orders = sorted(set(attacks) - self._seen_orders)
+        self._war_id = current_war
+        self._seen_orders = set(attacks)
+        self.snapshot = war_data
+        self.fetched_at = time.monotonic()
+
+        # Al arrancar o al cambiar de guerra solo se toma la foto, sin avisar de lo anterior
+        if first_look:
+            return []
+        return [attacks[order] for order in new_orders]
+
+    async def poll(self, context: ContextTypes.DEFAULT_TYPE):
+        try:
+            war_data = await coc_client.get(f"/clans/{CLAN_TAG}/currentwar")
+            if war_data:
+                for entry in self.apply(war_data):
+                    await send_to_topic_html(format_attack(entry), digest="war")
+            self.interval = next_interval(war_data or self.snapshot)
+        except Exception as e:
+            logger.error(f"Error consultando la guerra actual: {e}")
+        finally:
+            if self._job_queue is not None:
+                self._job_queue.run_once(self.poll, when=self.interval, name="war_tracker")
+
+
+# Instancia global compartida por el job y el comando /guerra
+war_tracker = WarTracker()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict
+
+from telegram.ext import Application
+
+from bot.commands.villages import get_rendered_villages
+from bot.jobs import notify_due_builds
+from bot.metrics import WARMUP_DURATION
+from bot.scheduler import build_scheduler
+from bot.utils import fetch_coc_data
+from data.dao.builders_dao import BuildersDAO
+from data.dao.members_dao import MembersDAO
+from data.dao.villages_dao import VillagesDAO
+from database import get_db, run_db
+from config import CLAN_TAG
+
+logger = logging.getLogger(__name__)
+
+
+async def _ping_mongo():
+    # Abre las conexiones del pool antes de la primera consulta de un comando
+    await run_db("ping", get_db().command, "ping")
+
+
+async def _load_clan():
+    await fetch_coc_data(f"/clans/{CLAN_TAG}")
+
+
+async def _load_members():
+    members_data = await fetch_coc_data(f"/clans/{CLAN_TAG}/members")
+    if members_data:
+        await MembersDAO().save_snapshot(members_data.get('items', []))
+
+
+async def _load_villages():
+    await get_rendered_villages(VillagesDAO())
+
+
+async def _load_builds(application: Application):
+    if application.job_queue is None:
+        return
+    builds = await BuildersDAO().get_pending_builds()
+    await build_scheduler.start(application.job_queue, notify_due_builds, builds)
+
+
+async def _timed(step: str, coro: Awaitable, durations: Dict[str, float]):
+    started = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        # Un paso fallido no impide arrancar: el comando correspondiente cargará en frío
+        logger.error(f"Error en el calentamiento ({step}): {e}")
+    finally:
+        durations[step] = time.perf_counter() - started
+        WARMUP_DURATION.labels(step).set(durations[step])
+
+
+async def warm_up(application: Application) -> float:
+    """Precarga en paralelo lo que necesitan los primeros comandos tras un arranque.
+
+    Abre los pools de MongoDB y de la API de CoC, deja en caché la info y los miembros del
+    clan, pinta la lista de /aldeas y carga las construcciones pendientes en el planificador.
+    Devuelve los segundos que tardó.
+    """
+    durations: Dict[str, float] = {}
+    started = time.perf_counter()
+    await asyncio.gather(
+        _timed("mongo", _ping_mongo(), durations),
+        _timed("clan", _load_clan(), durations),
+        _timed("members", _load_members(), durations),
+        _timed("villages", _load_villages(), durations),
+        _timed("builds", _load_builds(application), durations)
+    )
+    elapsed = time.perf_counter() - started
+    WARMUP_DURATION.labels("total").set(elapsed)
+    steps = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in durations.items())
+    logger.info(f"Calentamiento completado en {elapsed:.2f}s ({steps})")
+    return elapsed
@@ -0,0 +1,54 @@
+import hmac
+import logging
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from telegram.ext import Application
+
+from bot.metrics import render_metrics
+from config import WEBHOOK_PATH
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_web_app(application: Application, secret_token: Optional[str] = None) -> Starlette:
+    """Servidor HTTP del bot: health check, métricas y, en modo webhook, la entrada de updates.
+
+    Con `secret_token` se monta el endpoint del webhook, que solo acepta peticiones cuya
+    cabecera secreta coincida con la registrada en Telegram.
+    """
+
+    async def health_check(request: Request) -> Response:
+        return PlainTextResponse("Bot activo")
+
+    async def metrics(request: Request) -> Response:
+        body, content_type = render_metrics()
+        return Response(body, headers={"Content-Type": content_type})
+
+    async def telegram_webhook(request: Request) -> Response:
+        received = request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(received.encode(), secret_token.encode()):
+            logger.warning("Petición al webhook con token secreto inválido")
+            return Response(status_code=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.error(f"Update inválido recibido por el webhook: {e}")
+            return Response(status_code=400)
+        # Se responde en cuanto el update está en cola; el Application lo procesa aparte
+        await application.update_queue.put(update)
+        return Response()
+
+    routes = [
+        Route("/", health_check),
+        Route("/metrics", metrics)
+    ]
+    if secret_token:
+        routes.append(Route(WEBHOOK_PATH, telegram_webhook, methods=["POST"]))
+    return Starlette(routes=routes)
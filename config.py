@@ -15,6 +15,12 @@ COC_API_URL = "https://api.clashofclans.com/v1"
 COC_API_KEY = os.getenv("COC_API_KEY")
 COC_HEADERS = {"Authorization": f"Bearer {COC_API_KEY}"}
 CLAN_TAG = os.getenv("CLAN_TAG").replace("#", "%23")
+COC_REQUEST_TIMEOUT = float(os.getenv("COC_REQUEST_TIMEOUT", "15"))
+COC_MAX_CONCURRENCY = int(os.getenv("COC_MAX_CONCURRENCY", "10"))
+COC_MAX_CONNECTIONS = int(os.getenv("COC_MAX_CONNECTIONS", "20"))
+COC_MAX_RETRIES = int(os.getenv("COC_MAX_RETRIES", "2"))
+COC_CWL_CONCURRENCY = int(os.getenv("COC_CWL_CONCURRENCY", "8"))
+COC_CACHE_MAXSIZE = int(os.getenv("COC_CACHE_MAXSIZE", "256"))
 
 # Rutas de archivos
 BASE_DIR = Path(__file__).parent
@@ -25,5 +31,38 @@ MONGO_DB_URI = os.getenv("MONGO_DB_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 MONGO_DB_BUILDERS_COLLECTION = os.getenv("MONGO_DB_BUILDERS_COLLECTION")
 MONGO_DB_VILLAGES_COLLECTION = "villages"
+MONGO_DB_VILLAGES_META_COLLECTION = "villages_meta"
+MONGO_DB_BUILDER_PLAYERS_COLLECTION = "builder_players"
+MONGO_DB_BUILDS_COLLECTION = "builds"
+MONGO_DB_MEMBERS_COLLECTION = "clan_members"
+MONGO_DB_MEMBER_EVENTS_COLLECTION = "clan_member_events"
+MONGO_DB_CWL_WARS_COLLECTION = "cwl_wars"
+MONGO_DB_BOT_STATE_COLLECTION = "bot_state"
+MONGO_DB_POOL_SIZE = int(os.getenv("MONGO_DB_POOL_SIZE", "10"))
 
-URL_DOMAIN = os.getenv("URL_DOMAIN")
\ No newline at end of file
+URL_DOMAIN = os.getenv("URL_DOMAIN")
+KEEP_ALIVE_INTERVAL = float(os.getenv("KEEP_ALIVE_INTERVAL", "60"))
+KEEP_ALIVE_TIMEOUT = float(os.getenv("KEEP_ALIVE_TIMEOUT", "5"))
+KEEP_ALIVE_MAX_INTERVAL = float(os.getenv("KEEP_ALIVE_MAX_INTERVAL", "900"))
+
+# Servidor HTTP (health check, métricas y webhook)
+WEB_PORT = int(os.getenv("PORT", "8000"))
+# Con WEBHOOK_URL (URL pública del bot) los updates llegan por webhook en lugar de polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# Si no se define, se genera uno aleatorio en cada arranque al registrar el webhook
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Updates procesados a la vez (los de un mismo usuario siempre van en orden, de uno en uno)
+UPDATES_CONCURRENCY = int(os.getenv("UPDATES_CONCURRENCY", "16"))
+# Estado de menús y conversaciones: segundos sin actividad hasta caducar y cada cuánto se guarda
+STATE_TTL = float(os.getenv("STATE_TTL", "86400"))
+STATE_UPDATE_INTERVAL = float(os.getenv("STATE_UPDATE_INTERVAL", "30"))
+MEMBERS_SNAPSHOT_INTERVAL = float(os.getenv("MEMBERS_SNAPSHOT_INTERVAL", "300"))
+
+# Envío a Telegram
+TELEGRAM_CHAT_RATE_PER_MINUTE = int(os.getenv("TELEGRAM_CHAT_RATE_PER_MINUTE", "20"))
+TELEGRAM_DIGEST_WINDOW = float(os.getenv("TELEGRAM_DIGEST_WINDOW", "5"))
+PROGRESS_THRESHOLD = float(os.getenv("PROGRESS_THRESHOLD", "1.5"))
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "1"))
\ No newline at end of file
@@ -0,0 +1,104 @@
+from typing import Dict, Hashable, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from database import get_collection, run_db
+from pymongo import ASCENDING, DeleteOne, UpdateOne
+from pymongo.errors import PyMongoError
+import json
+import logging
+from config import MONGO_DB_BOT_STATE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+def _user_id(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _conversation_id(name: str, key: Tuple) -> str:
+    return f"conversation:{name}:{json.dumps(list(key))}"
+
+
+def _not_older_than(query: Dict, max_age: Optional[float]) -> Dict:
+    # El índice TTL borra con hasta un minuto de retraso: no basta con confiar en él
+    if max_age is not None:
+        query["updated_at"] = {"$gte": datetime.now(timezone.utc) - timedelta(seconds=max_age)}
+    return query
+
+
+class BotStateDAO:
+    """Estado de las conversaciones con el bot (user_data y ConversationHandler).
+
+    Cada documento lleva `updated_at`; un índice TTL borra las sesiones abandonadas.
+    """
+
+    def __init__(self):
+        self.collection = get_collection(MONGO_DB_BOT_STATE_COLLECTION)
+
+    async def ensure_indexes(self, ttl: float):
+        try:
+            await run_db(
+                "ensure_indexes",
+                self.collection.create_index, [("updated_at", ASCENDING)], expireAfterSeconds=int(ttl)
+            )
+            await run_db("ensure_indexes", self.collection.create_index, [("kind", ASCENDING), ("name", ASCENDING)])
+        except PyMongoError as e:
+            logger.error(f"Error creando índices del estado del bot: {e}")
+
+    async def get_user_data(self, max_age: Optional[float] = None) -> Dict[int, Dict]:
+        """user_data guardado; con `max_age` se omite el que lleva más segundos sin cambiar"""
+        query = _not_older_than({"kind": "user"}, max_age)
+        try:
+            docs = await run_db("get_user_data", lambda: list(self.collection.find(query, {"user_id": 1, "data": 1})))
+            return {doc["user_id"]: doc["data"] for doc in docs}
+        except PyMongoError as e:
+            logger.error(f"Error cargando estado de usuarios: {e}")
+            return {}
+
+    async def get_conversations(self, name: str, max_age: Optional[float] = None) -> Dict[Tuple, object]:
+        """Conversaciones guardadas; con `max_age` se omiten las que llevan más segundos sin cambiar"""
+        query = _not_older_than({"kind": "conversation", "name": name}, max_age)
+        try:
+            docs = await run_db("get_conversations", lambda: list(self.collection.find(query, {"key": 1, "state": 1})))
+            return {tuple(doc["key"]): doc["state"] for doc in docs}
+        except PyMongoError as e:
+            logger.error(f"Error cargando conversaciones {name}: {e}")
+            return {}
+
+    async def save(
+            self,
+            users: Dict[int, Optional[Dict]],
+            conversations: Dict[Tuple[str, Tuple[Hashable, ...]], object]
+    ) -> bool:
+        """Escribe en una sola operación los usuarios y conversaciones modificados.
+
+        Un valor None (o un user_data vacío) borra el documento correspondiente.
+        """
+        now = datetime.now(timezone.utc)
+        operations = []
+        for user_id, data in users.items():
+            if data:
+                operations.append(UpdateOne(
+                    {"_id": _user_id(user_id)},
+                    {"$set": {"kind": "user", "user_id": user_id, "data": data, "updated_at": now}},
+                    upsert=True
+                ))
+            else:
+                operations.append(DeleteOne({"_id": _user_id(user_id)}))
+        for (name, key), state in conversations.items():
+            if state is not None:
+                operations.append(UpdateOne(
+                    {"_id": _conversation_id(name, key)},
+                    {"$set": {"kind": "conversation", "name": name, "key": list(key),
+                              "state": state, "updated_at": now}},
+                    upsert=True
+                ))
+            else:
+                operations.append(DeleteOne({"_id": _conversation_id(name, key)}))
+        if not operations:
+            return True
+        try:
+            await run_db("save", self.collection.bulk_write, operations, ordered=False)
+            return True
+        except PyMongoError as e:
+            logger.error(f"Error guardando estado del bot: {e}")
+            return False
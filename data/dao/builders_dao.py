@@ -1,23 +1,125 @@
 from typing import Dict, List, Optional
 from datetime import datetime
-from database import get_collection
-from pymongo.errors import PyMongoError
+from database import get_collection, run_db
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import PyMongoError, DuplicateKeyError
 import logging
-from config import MONGO_DB_BUILDERS_COLLECTION
+from config import MONGO_DB_BUILDERS_COLLECTION, MONGO_DB_BUILDER_PLAYERS_COLLECTION, MONGO_DB_BUILDS_COLLECTION
 import uuid
 
 logger = logging.getLogger(__name__)
 
 
+def _build_to_dict(doc: Dict) -> Dict:
+    """Convierte un documento de la colección de construcciones al formato que usan los comandos"""
+    return {
+        "task_id": doc["_id"],
+        "start_time": doc.get("start_time").isoformat() if doc.get("start_time") else None,
+        "end_time": doc["end_time"].isoformat(),
+        "duration": doc.get("duration"),
+        "description": doc.get("description"),
+        "status": doc.get("status", "active")
+    }
+
+
 class BuildersDAO:
     def __init__(self):
         self.collection = get_collection(MONGO_DB_BUILDERS_COLLECTION)
+        # Índice tag de jugador -> usuario de Telegram; el _id (tag) garantiza la unicidad
+        self.players = get_collection(MONGO_DB_BUILDER_PLAYERS_COLLECTION)
+        # Una construcción por documento (_id = task_id), indexadas por end_time y por cuenta
+        self.builds = get_collection(MONGO_DB_BUILDS_COLLECTION)
+
+    async def sync_player_index(self) -> int:
+        """Crea los índices y rellena el índice de jugadores con las cuentas ya registradas"""
+        try:
+            await run_db("sync_player_index", self.players.create_index, "user_id")
+            docs = await run_db(
+                "sync_player_index",
+                lambda: list(self.collection.find({}, {"data.accounts": 1, "data.username": 1}))
+            )
+            operations = [
+                UpdateOne(
+                    {"_id": tag},
+                    {"$setOnInsert": {"user_id": str(doc["_id"]), "username": doc["data"].get("username")}},
+                    upsert=True
+                )
+                for doc in docs
+                for tag in doc.get("data", {}).get("accounts", {})
+            ]
+            if not operations:
+                return 0
+            result = await run_db("sync_player_index", self.players.bulk_write, operations, ordered=False)
+            return result.upserted_count
+        except PyMongoError as e:
+            logger.error(f"Error sincronizando índice de jugadores: {e}")
+            return 0
+
+    async def migrate_builds(self) -> int:
+        """Crea los índices de construcciones y mueve las anidadas en active_builds a su colección"""
+        try:
+            await run_db("migrate_builds", self.builds.create_index, [("end_time", ASCENDING)])
+            await run_db(
+                "migrate_builds",
+                self.builds.create_index, [("user_id", ASCENDING), ("player_tag", ASCENDING)]
+            )
+
+            docs = await run_db("migrate_builds", lambda: list(self.collection.find({}, {"data.accounts": 1})))
+            migrated = 0
+            for doc in docs:
+                accounts = doc.get("data", {}).get("accounts", {})
+                if not any("active_builds" in account for account in accounts.values()):
+                    continue
+
+                operations = [
+                    UpdateOne(
+                        {"_id": build.get("task_id") or str(uuid.uuid4())},
+                        {"$setOnInsert": {
+                            "user_id": str(doc["_id"]),
+                            "player_tag": tag,
+                            "start_time": datetime.fromisoformat(build["start_time"]) if build.get("start_time") else None,
+                            "end_time": datetime.fromisoformat(build["end_time"]),
+                            "duration": build.get("duration"),
+                            "description": build.get("description"),
+                            "status": build.get("status", "active")
+                        }},
+                        upsert=True
+                    )
+                    for tag, account in accounts.items()
+                    for build in account.get("active_builds", [])
+                ]
+                if operations:
+                    await run_db("migrate_builds", self.builds.bulk_write, operations, ordered=False)
+                await run_db(
+                    "migrate_builds",
+                    self.collection.update_one,
+                    {"_id": doc["_id"]},
+                    {"$unset": {f"data.accounts.{tag}.active_builds": "" for tag in accounts}}
+                )
+                migrated += len(operations)
+            return migrated
+        except PyMongoError as e:
+            logger.error(f"Error migrando construcciones: {e}")
+            return 0
 
     async def get_user_builders(self, user_id: str) -> Optional[Dict]:
-        """Obtiene todos los constructores de un usuario"""
+        """Obtiene todos los constructores de un usuario con sus construcciones activas"""
         try:
-            result = self.collection.find_one({"_id": user_id})
-            return result["data"] if result else None
+            result = await run_db("get_user_builders", self.collection.find_one, {"_id": user_id})
+            if not result:
+                return None
+            data = result["data"]
+            builds = await run_db(
+                "get_user_builders",
+                lambda: list(self.builds.find({"user_id": user_id}).sort("end_time", ASCENDING))
+            )
+            for account in data.get("accounts", {}).values():
+                account["active_builds"] = []
+            for build in builds:
+                account = data.get("accounts", {}).get(build["player_tag"])
+                if account is not None:
+                    account["active_builds"].append(_build_to_dict(build))
+            return data
         except PyMongoError as e:
             logger.error(f"Error obteniendo constructores: {e}")
             return None
@@ -30,17 +132,34 @@ class BuildersDAO:
             player_data: Dict,
             builder_count: int
     ) -> bool:
-        """Añade una nueva cuenta de constructor a un usuario"""
+        """Añade una nueva cuenta de constructor a un usuario.
+
+        El tag se reserva primero en el índice de jugadores; si otro usuario ya lo tiene,
+        la base de datos rechaza la inserción y no se registra nada.
+        """
+        try:
+            await run_db(
+                "add_builder_account",
+                self.players.insert_one, {"_id": player_tag, "user_id": user_id, "username": username}
+            )
+        except DuplicateKeyError:
+            logger.warning(f"El jugador {player_tag} ya está registrado")
+            return False
+        except PyMongoError as e:
+            logger.error(f"Error reservando jugador: {e}")
+            return False
+
         try:
             account_data = {
                 "name": player_data["name"],
                 "max_builders": builder_count,
-                "active_builds": [],
                 "registered_at": datetime.now().isoformat(),
                 "th_level": player_data["townHallLevel"]
             }
 
-            result = self.collection.update_one(
+            result = await run_db(
+                "add_builder_account",
+                self.collection.update_one,
                 {"_id": user_id},
                 {"$set": {
                     f"data.accounts.{player_tag}": account_data,
@@ -51,7 +170,12 @@ class BuildersDAO:
             return result.modified_count > 0 or result.upserted_id is not None
         except PyMongoError as e:
             logger.error(f"Error añadiendo cuenta de constructor: {e}")
-            return False
+        # Liberar la reserva para no dejar el tag bloqueado
+        try:
+            await run_db("add_builder_account", self.players.delete_one, {"_id": player_tag, "user_id": user_id})
+        except PyMongoError as e:
+            logger.error(f"Error liberando jugador {player_tag}: {e}")
+        return False
 
     async def add_builder_task(
             self,
@@ -61,14 +185,28 @@ class BuildersDAO:
     ) -> bool:
         """Añade una nueva tarea de construcción"""
         try:
+            # La cuenta debe pertenecer al usuario
+            owner = await run_db(
+                "add_builder_task",
+                self.players.find_one, {"_id": player_tag, "user_id": user_id}, {"_id": 1}
+            )
+            if not owner:
+                return False
+
             # Añadir ID único a la tarea
             task_data["task_id"] = str(uuid.uuid4())
-            
-            result = self.collection.update_one(
-                {"_id": user_id, f"data.accounts.{player_tag}": {"$exists": True}},
-                {"$push": {f"data.accounts.{player_tag}.active_builds": task_data}}
-            )
-            return result.modified_count > 0
+
+            result = await run_db("add_builder_task", self.builds.insert_one, {
+                "_id": task_data["task_id"],
+                "user_id": user_id,
+                "player_tag": player_tag,
+                "start_time": datetime.fromisoformat(task_data["start_time"]),
+                "end_time": datetime.fromisoformat(task_data["end_time"]),
+                "duration": task_data.get("duration"),
+                "description": task_data.get("description"),
+                "status": task_data.get("status", "active")
+            })
+            return result.inserted_id is not None
         except PyMongoError as e:
             logger.error(f"Error añadiendo tarea de construcción: {e}")
             return False
@@ -81,29 +219,67 @@ class BuildersDAO:
     ) -> bool:
         """Cancela una tarea de construcción usando su ID único"""
         try:
-            result = self.collection.update_one(
-                {"_id": user_id},
-                {"$pull": {
-                    f"data.accounts.{player_tag}.active_builds": {
-                        "task_id": task_id
-                    }
-                }}
+            result = await run_db(
+                "cancel_builder_task",
+                self.builds.delete_one,
+                {"_id": task_id, "user_id": user_id, "player_tag": player_tag}
             )
-            return result.modified_count > 0
+            return result.deleted_count > 0
         except PyMongoError as e:
             logger.error(f"Error cancelando tarea de construcción: {e}")
             return False
 
+    async def remove_builder_tasks(self, builds: List[Dict]) -> int:
+        """Elimina varias construcciones (por su task_id) en una sola operación"""
+        if not builds:
+            return 0
+        try:
+            result = await run_db(
+                "remove_builder_tasks",
+                self.builds.delete_many,
+                {"_id": {"$in": [build["task_id"] for build in builds]}}
+            )
+            return result.deleted_count
+        except PyMongoError as e:
+            logger.error(f"Error eliminando tareas de construcción: {e}")
+            return 0
+
     async def is_player_registered(self, player_tag: str) -> tuple:
         """Verifica si un jugador ya está registrado y devuelve (estado, dueño)"""
         try:
-            result = self.collection.find_one(
-                {f"data.accounts.{player_tag}": {"$exists": True}},
-                {"_id": 1, "data.username": 1}
-            )
+            result = await run_db("is_player_registered", self.players.find_one, {"_id": player_tag})
             if result:
-                return (True, result.get("data", {}).get("username", "usuario desconocido"))
+                return (True, result.get("username") or "usuario desconocido")
             return (False, None)
         except PyMongoError as e:
             logger.error(f"Error verificando jugador registrado: {e}")
-            return (False, None)
\ No newline at end of file
+            return (False, None)
+
+    async def get_pending_builds(self) -> List[Dict]:
+        """Obtiene todas las construcciones activas ordenadas por fin, con los datos de su dueño"""
+        try:
+            builds = await run_db(
+                "get_pending_builds",
+                lambda: list(self.builds.find({"status": "active"}).sort("end_time", ASCENDING))
+            )
+            user_ids = list({build["user_id"] for build in builds})
+            users = await run_db("get_pending_builds", lambda: {
+                doc["_id"]: doc.get("data", {})
+                for doc in self.collection.find({"_id": {"$in": user_ids}}, {"data.username": 1, "data.accounts": 1})
+            })
+
+            pending = []
+            for build in builds:
+                user = users.get(build["user_id"], {})
+                account = user.get("accounts", {}).get(build["player_tag"], {})
+                pending.append({
+                    "user_id": build["user_id"],
+                    "username": user.get("username"),
+                    "player_tag": build["player_tag"],
+                    "account_name": account.get("name"),
+                    **_build_to_dict(build)
+                })
+            return pending
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo construcciones pendientes: {e}")
+            return []
\ No newline at end of file
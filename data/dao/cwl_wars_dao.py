@@ -0,0 +1,39 @@
+from typing import Dict, List
+from datetime import datetime
+from database import get_collection, run_db
+from pymongo.errors import PyMongoError
+import logging
+from config import MONGO_DB_CWL_WARS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+class CwlWarsDAO:
+    """Almacén permanente de guerras de liga ya terminadas, indexadas por su war tag"""
+
+    def __init__(self):
+        self.collection = get_collection(MONGO_DB_CWL_WARS_COLLECTION)
+
+    async def get_ended_wars(self, war_tags: List[str]) -> Dict[str, Dict]:
+        """Obtiene las guerras terminadas ya guardadas para los tags indicados"""
+        try:
+            docs = await run_db("get_ended_wars", lambda: list(self.collection.find({"_id": {"$in": war_tags}})))
+            return {doc["_id"]: doc["war"] for doc in docs}
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo guerras de liga: {e}")
+            return {}
+
+    async def save_ended_war(self, war_tag: str, war_data: Dict) -> bool:
+        """Guarda una guerra terminada; su contenido ya no cambia"""
+        try:
+            await run_db(
+                "save_ended_war",
+                self.collection.replace_one,
+                {"_id": war_tag},
+                {"_id": war_tag, "war": war_data, "saved_at": datetime.now().isoformat()},
+                upsert=True
+            )
+            return True
+        except PyMongoError as e:
+            logger.error(f"Error guardando guerra de liga: {e}")
+            return False
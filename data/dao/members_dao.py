@@ -0,0 +1,126 @@
+from typing import Dict, List
+from datetime import datetime
+from database import get_collection, run_db
+from pymongo import UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+import logging
+from config import MONGO_DB_MEMBERS_COLLECTION, MONGO_DB_MEMBER_EVENTS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Campos que se guardan de cada miembro (clave compacta -> campo de la API)
+SNAPSHOT_FIELDS = {
+    "name": "name",
+    "th": "townHallLevel",
+    "donations": "donations",
+    "trophies": "trophies",
+    "rank": "clanRank"
+}
+
+
+class MembersDAO:
+    """Foto de los miembros del clan con historial de altas, bajas y donaciones"""
+
+    def __init__(self):
+        self.collection = get_collection(MONGO_DB_MEMBERS_COLLECTION)
+        self.events = get_collection(MONGO_DB_MEMBER_EVENTS_COLLECTION)
+
+    async def ensure_indexes(self):
+        try:
+            await run_db("ensure_indexes", self.collection.create_index, [("in_clan", ASCENDING), ("rank", ASCENDING)])
+            await run_db("ensure_indexes", self.events.create_index, [("type", ASCENDING), ("at", DESCENDING)])
+            await run_db("ensure_indexes", self.events.create_index, [("tag", ASCENDING), ("at", DESCENDING)])
+        except PyMongoError as e:
+            logger.error(f"Error creando índices de miembros: {e}")
+
+    async def save_snapshot(self, members: List[Dict]) -> int:
+        """Guarda la lista de miembros de la API escribiendo solo lo que cambió.
+
+        Devuelve el número de miembros modificados. Registra altas, bajas y el
+        incremento de donaciones desde la foto anterior.
+        """
+        try:
+            now = datetime.now()
+            stored = {
+                doc["_id"]: doc
+                for doc in await run_db("save_snapshot", lambda: list(self.collection.find({"in_clan": True})))
+            }
+            operations, events = [], []
+            current_tags = set()
+
+            for member in members:
+                tag = member["tag"]
+                current_tags.add(tag)
+                compact = {key: member.get(field) for key, field in SNAPSHOT_FIELDS.items()}
+                previous = stored.get(tag)
+
+                if previous is None:
+                    operations.append(UpdateOne(
+                        {"_id": tag},
+                        {
+                            "$set": {**compact, "in_clan": True, "updated_at": now, "joined_at": now},
+                            # Un miembro que vuelve deja de constar como ido
+                            "$unset": {"left_at": ""}
+                        },
+                        upsert=True
+                    ))
+                    events.append({"tag": tag, "name": compact["name"], "type": "join", "at": now})
+                    continue
+
+                changes = {key: value for key, value in compact.items() if previous.get(key) != value}
+                if not changes:
+                    continue
+                operations.append(UpdateOne({"_id": tag}, {"$set": {**changes, "updated_at": now}}))
+
+                if "donations" in changes:
+                    old, new = previous.get("donations") or 0, compact["donations"] or 0
+                    # Las donaciones se reinician cada temporada: si bajan, lo donado es el valor nuevo
+                    delta = new - old if new >= old else new
+                    if delta:
+                        events.append({"tag": tag, "name": compact["name"], "type": "donations",
+                                       "delta": delta, "at": now})
+
+            for tag in stored.keys() - current_tags:
+                operations.append(UpdateOne({"_id": tag}, {"$set": {"in_clan": False, "left_at": now}}))
+                events.append({"tag": tag, "name": stored[tag].get("name"), "type": "leave", "at": now})
+
+            if operations:
+                await run_db("save_snapshot", self.collection.bulk_write, operations, ordered=False)
+            if events:
+                await run_db("save_snapshot", self.events.insert_many, events, ordered=False)
+            return len(operations)
+        except PyMongoError as e:
+            logger.error(f"Error guardando foto de miembros: {e}")
+            return 0
+
+    async def get_current_members(self) -> List[Dict]:
+        """Obtiene los miembros actuales ordenados por rango en el clan"""
+        try:
+            return await run_db("get_current_members", lambda: list(
+                self.collection.find({"in_clan": True}).sort("rank", ASCENDING)
+            ))
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo miembros: {e}")
+            return []
+
+    async def get_donation_totals(self, since: datetime) -> List[Dict]:
+        """Suma las donaciones registradas por jugador desde una fecha (p. ej. inicio de temporada)"""
+        try:
+            return await run_db("get_donation_totals", lambda: list(self.events.aggregate([
+                {"$match": {"type": "donations", "at": {"$gte": since}}},
+                {"$group": {"_id": "$tag", "name": {"$last": "$name"}, "donations": {"$sum": "$delta"}}},
+                {"$sort": {"donations": -1}}
+            ])))
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo donaciones: {e}")
+            return []
+
+    async def get_membership_history(self, limit: int = 20) -> List[Dict]:
+        """Últimas altas y bajas del clan"""
+        try:
+            return await run_db("get_membership_history", lambda: list(
+                self.events.find({"type": {"$in": ["join", "leave"]}}).sort("at", DESCENDING).limit(limit)
+            ))
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo historial de miembros: {e}")
+            return []
\ No newline at end of file
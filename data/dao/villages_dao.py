@@ -1,23 +1,44 @@
 from typing import Dict, List, Optional
 from datetime import datetime
-from database import get_collection
+from database import get_collection, run_db
+from pymongo import ASCENDING
 from pymongo.errors import PyMongoError
 import logging
-from config import BOT_OWNER_USERNAME
+from config import BOT_OWNER_USERNAME, MONGO_DB_VILLAGES_COLLECTION, MONGO_DB_VILLAGES_META_COLLECTION
+
+# Campos necesarios para pintar la lista de /aldeas
+RENDER_PROJECTION = {"_id": 0, "th_level": 1, "type": 1, "url": 1, "description": 1}
 
 logger = logging.getLogger(__name__)
 
 class VillagesDAO:
     def __init__(self):
-        self.collection = get_collection("villages")
+        self.collection = get_collection(MONGO_DB_VILLAGES_COLLECTION)
+        # Guarda la versión de la colección, que se incrementa en cada alta
+        self.meta = get_collection(MONGO_DB_VILLAGES_META_COLLECTION)
+
+    async def ensure_indexes(self):
+        try:
+            await run_db("ensure_indexes", self.collection.create_index, [("th_level", ASCENDING), ("type", ASCENDING)])
+        except PyMongoError as e:
+            logger.error(f"Error creando índices de aldeas: {e}")
+
+    async def get_version(self) -> int:
+        """Versión actual de la colección de aldeas (0 si nunca se ha escrito)"""
+        try:
+            doc = await run_db("get_version", self.meta.find_one, {"_id": MONGO_DB_VILLAGES_COLLECTION})
+            return doc["version"] if doc else 0
+        except PyMongoError as e:
+            logger.error(f"Error obteniendo versión de aldeas: {e}")
+            return -1
 
     async def get_all_villages(self) -> List[Dict]:
         """Obtiene todas las aldeas ordenadas por TH y tipo"""
         try:
-            return list(self.collection.find().sort([
+            return await run_db("get_all_villages", lambda: list(self.collection.find({}, RENDER_PROJECTION).sort([
                 ("th_level", 1),
                 ("type", 1)
-            ]))
+            ])))
         except PyMongoError as e:
             logger.error(f"Error obteniendo aldeas: {e}")
             return []
@@ -41,7 +62,14 @@ class VillagesDAO:
                 "added_at": datetime.now().isoformat()
             }
             
-            result = self.collection.insert_one(village_data)
+            result = await run_db("add_village", self.collection.insert_one, village_data)
+            await run_db(
+                "add_village",
+                self.meta.update_one,
+                {"_id": MONGO_DB_VILLAGES_COLLECTION},
+                {"$inc": {"version": 1}},
+                upsert=True
+            )
             return result.inserted_id is not None
         except PyMongoError as e:
             logger.error(f"Error añadiendo aldea: {e}")
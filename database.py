@@ -1,10 +1,18 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
-from config import MONGO_DB_URI, MONGO_DB_NAME
+from config import MONGO_DB_URI, MONGO_DB_NAME, MONGO_DB_POOL_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Funciones (operación, segundos) que reciben la duración de cada operación de run_db
+_operation_observers: List[Callable[[str, float], None]] = []
+
 
 class MongoDB:
     _instance = None
@@ -12,14 +20,20 @@ class MongoDB:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.client = MongoClient(MONGO_DB_URI)
+            cls._instance.client = MongoClient(MONGO_DB_URI, maxPoolSize=MONGO_DB_POOL_SIZE)
             cls._instance.db = cls._instance.client[MONGO_DB_NAME]
+            # Hilos dedicados a pymongo: las consultas no bloquean el event loop de Telegram
+            cls._instance.executor = ThreadPoolExecutor(
+                max_workers=MONGO_DB_POOL_SIZE,
+                thread_name_prefix="mongo"
+            )
         return cls._instance
 
     def get_collection(self, name: str):
         return self.db[name]
 
     def close(self):
+        self.executor.shutdown(wait=False)
         self.client.close()
 
 
@@ -29,4 +43,24 @@ def get_db():
 
 
 def get_collection(collection_name: str):
-    return MongoDB().get_collection(collection_name)
\ No newline at end of file
+    return MongoDB().get_collection(collection_name)
+
+
+def add_operation_observer(observer: Callable[[str, float], None]):
+    """Registra una función que recibe el nombre y la duración de cada operación de run_db"""
+    _operation_observers.append(observer)
+
+
+async def run_db(operation: str, func, *args, **kwargs):
+    """Ejecuta una operación bloqueante de pymongo en el pool de hilos de la base de datos.
+
+    `operation` nombra la consulta (el método del DAO que la pide) al informar su duración.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(MongoDB().executor, partial(func, *args, **kwargs))
+    finally:
+        elapsed = time.perf_counter() - started
+        for observer in _operation_observers:
+            observer(operation, elapsed)
\ No newline at end of file
@@ -1,10 +1,33 @@
+import asyncio
 import logging
+import secrets
+import uvicorn
+from telegram import Update
 from telegram.ext import Application
 from bot.handlers import register_handlers
-from bot.jobs import check_builders_notifications
-from config import TELEGRAM_TOKEN
-from flask import Flask
-import threading
+from bot.jobs import refresh_members_snapshot
+from bot.keep_alive import keep_alive_pinger
+from bot.war_tracker import war_tracker
+from bot.capital_tracker import capital_tracker
+from bot.coc_client import coc_client
+from bot.metrics import instrument_application, instrument_database, loop_lag_monitor
+from bot.ordered_application import OrderedApplication
+from bot.persistence import MongoPersistence
+from bot.warmup import warm_up
+from bot.webserver import create_web_app
+from data.dao.builders_dao import BuildersDAO
+from data.dao.members_dao import MembersDAO
+from data.dao.villages_dao import VillagesDAO
+from config import (
+    TELEGRAM_TOKEN,
+    MEMBERS_SNAPSHOT_INTERVAL,
+    STATE_TTL,
+    WEB_PORT,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_MAX_CONNECTIONS
+)
 from database import MongoDB
 
 logging.basicConfig(
@@ -13,41 +36,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Crea un servidor HTTP mínimo en un puerto secundario
-app = Flask(__name__)
+
+async def migrate_builders(builders_dao: BuildersDAO):
+    indexed = await builders_dao.sync_player_index()
+    if indexed:
+        logger.info(f"{indexed} jugadores añadidos al índice de constructores")
+    migrated = await builders_dao.migrate_builds()
+    if migrated:
+        logger.info(f"{migrated} construcciones migradas a su propia colección")
+
+
+async def post_init(application: Application):
+    """Prepara la base de datos y calienta cachés y pools antes de recibir updates"""
+    await asyncio.gather(
+        migrate_builders(BuildersDAO()),
+        MembersDAO().ensure_indexes(),
+        VillagesDAO().ensure_indexes()
+    )
+    loop_lag_monitor.start()
+    # Las construcciones pendientes se cargan aquí, ya migradas
+    await warm_up(application)
+
+    if application.job_queue is None:
+        logger.warning("JobQueue no disponible. Notificaciones desactivadas")
+        return
+    # Con los pools abiertos no hace falta retrasar la primera consulta
+    war_tracker.start(application.job_queue, first=0)
+    capital_tracker.start(application.job_queue, first=0)
+    keep_alive_pinger.start(application.job_queue)
 
 
-@app.route('/')
-def health_check():
-    return "Bot activo", 200
+async def close_clients(application: Application):
+    """Cierra los pools de conexiones al detener el bot"""
+    loop_lag_monitor.stop()
+    await coc_client.close()
+    await keep_alive_pinger.close()
 
 
-def run_flask():
-    app.run(host='0.0.0.0', port=8000)
+async def run_bot(application: Application):
+    """Arranca el bot y el servidor HTTP en el mismo event loop.
+
+    Con WEBHOOK_URL los updates llegan por el endpoint del webhook; si no, por long polling.
+    El servidor HTTP (health check y métricas) se sirve en ambos modos.
+    """
+    secret_token = (WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)) if WEBHOOK_URL else None
+    server = uvicorn.Server(uvicorn.Config(
+        create_web_app(application, secret_token),
+        host="0.0.0.0",
+        port=WEB_PORT,
+        log_level="warning"
+    ))
+
+    async with application:
+        await post_init(application)
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+                secret_token=secret_token,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True
+            )
+            logger.info(f"Webhook registrado en {WEBHOOK_URL}{WEBHOOK_PATH}")
+        else:
+            await application.bot.delete_webhook(drop_pending_updates=True)
+            await application.updater.start_polling()
+        await application.start()
+        try:
+            # Hasta recibir SIGINT/SIGTERM
+            await server.serve()
+        finally:
+            if application.updater is not None and application.updater.running:
+                await application.updater.stop()
+            await application.stop()
+            await close_clients(application)
 
 
 def main():
 
     mongo = MongoDB()
 
-    flask_thread = threading.Thread(target=run_flask)
-    flask_thread.start()
-
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .application_class(OrderedApplication)
+        # Una tarea por update; OrderedApplication limita la concurrencia y ordena por usuario
+        .concurrent_updates(True)
+    )
+    if WEBHOOK_URL:
+        # Sin Updater: los updates los mete en la cola el endpoint del webhook
+        builder = builder.updater(None)
+    persistence = MongoPersistence()
+    application = builder.persistence(persistence).build()
     register_handlers(application)
-    if hasattr(application, "job_queue"):
+    instrument_application(application)
+    instrument_database()
+    if application.job_queue is not None:
+        application.job_queue.run_repeating(
+            refresh_members_snapshot,
+            interval=MEMBERS_SNAPSHOT_INTERVAL,
+            # El calentamiento ya guarda la primera foto
+            first=MEMBERS_SNAPSHOT_INTERVAL
+        )
         application.job_queue.run_repeating(
-            check_builders_notifications,
-            interval=60.0,
-            first=10.0
+            persistence.expire_idle_users,
+            interval=min(STATE_TTL, 3600),
+            first=min(STATE_TTL, 3600)
         )
-        logger.info("JobQueue configurado para notificaciones")
+        logger.info("JobQueue configurado para la foto de miembros y la caducidad de sesiones")
     else:
         logger.warning("JobQueue no disponible. Notificaciones desactivadas")
 
-    application.bot.delete_webhook(drop_pending_updates=True)
     try:
-        application.run_polling()
+        asyncio.run(run_bot(application))
     finally:
         mongo.close()
 
@@ -0,0 +1,21 @@
+"""Entorno mínimo para importar config y los módulos del bot sin un .env real"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TEST_CHAT_ID = -100123456789
+TEST_TOPIC_ID = 1
+
+for key, value in {
+    "TELEGRAM_TOKEN": "123456:TEST",
+    "ALLOWED_GROUP_ID": str(TEST_CHAT_ID),
+    "ALERTAS_TOPIC_ID": str(TEST_TOPIC_ID),
+    "COC_API_KEY": "test",
+    "CLAN_TAG": "#2PPYLQG80",
+    "MONGO_DB_URI": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "friends_bot_test",
+    "MONGO_DB_BUILDERS_COLLECTION": "builders"
+}.items():
+    os.environ[key] = value
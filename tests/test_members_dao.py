@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.harness import use_mongomock
+from data.dao.members_dao import MembersDAO
+
+
+@pytest.fixture
+def dao():
+    # Cada test empieza con un cliente mongomock vacío
+    use_mongomock()
+    return MembersDAO()
+
+
+def member(tag: str, name: str, donations: int = 0):
+    return {"tag": tag, "name": name, "townHallLevel": 14, "donations": donations,
+            "trophies": 4000, "clanRank": 1}
+
+
+def test_rejoin_clears_left_at(dao):
+    asyncio.run(dao.save_snapshot([member("#A", "Ana"), member("#B", "Beto")]))
+    asyncio.run(dao.save_snapshot([member("#A", "Ana")]))
+    assert dao.collection.find_one({"_id": "#B"})["in_clan"] is False
+    assert "left_at" in dao.collection.find_one({"_id": "#B"})
+
+    asyncio.run(dao.save_snapshot([member("#A", "Ana"), member("#B", "Beto")]))
+
+    doc = dao.collection.find_one({"_id": "#B"})
+    assert doc["in_clan"] is True
+    assert "left_at" not in doc
+    assert [event["type"] for event in dao.events.find({"tag": "#B"}).sort("_id", 1)] == ["join", "leave", "join"]
+
+
+def test_weekly_history_queries(dao):
+    asyncio.run(dao.save_snapshot([member("#A", "Ana", donations=10), member("#B", "Beto", donations=5)]))
+    asyncio.run(dao.save_snapshot([member("#A", "Ana", donations=40)]))
+    asyncio.run(dao.save_snapshot([member("#A", "Ana", donations=55)]))
+
+    totals = asyncio.run(dao.get_donation_totals(datetime.now() - timedelta(days=7)))
+    assert [(t["_id"], t["donations"]) for t in totals] == [("#A", 45)]
+
+    history = [(event["tag"], event["type"]) for event in asyncio.run(dao.get_membership_history(limit=3))]
+    # Las dos altas comparten instante: solo la baja tiene una posición fija
+    assert history[0] == ("#B", "leave")
+    assert sorted(history[1:]) == [("#A", "join"), ("#B", "join")]
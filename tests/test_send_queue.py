@@ -0,0 +1,40 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from bot.send_queue import SendQueue
+
+
+def test_notify_resolves_after_digest_is_sent():
+    bot = AsyncMock()
+
+    async def scenario():
+        queue = SendQueue(bot, rate_per_minute=1000, digest_window=0.01)
+        first = queue.notify(1, "uno", group="builds")
+        second = queue.notify(1, "dos", group="builds")
+        assert not first.done()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [True, True]
+    bot.send_message.assert_awaited_once_with(chat_id=1, text="uno\n\ndos")
+
+
+def test_notify_reports_failed_delivery():
+    bot = AsyncMock()
+    bot.send_message.side_effect = RuntimeError("Telegram caído")
+
+    async def scenario():
+        queue = SendQueue(bot, rate_per_minute=1000, digest_window=0.01)
+        return await queue.notify(1, "uno", group="builds")
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_notify_keeps_groups_apart():
+    bot = AsyncMock()
+
+    async def scenario():
+        queue = SendQueue(bot, rate_per_minute=1000, digest_window=0.01)
+        await asyncio.gather(queue.notify(1, "guerra", group="war"), queue.notify(1, "obra", group="builds"))
+
+    asyncio.run(scenario())
+    assert sorted(call.kwargs["text"] for call in bot.send_message.await_args_list) == ["guerra", "obra"]
@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from bot import utils
+from tests.conftest import TEST_CHAT_ID, TEST_TOPIC_ID
+
+
+def make_update(chat_id: int = TEST_CHAT_ID):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        message=SimpleNamespace(reply_text=AsyncMock())
+    )
+
+
+def test_send_to_topic_escapes_and_sends_to_topic(monkeypatch):
+    send = AsyncMock()
+    monkeypatch.setattr(utils.send_queue, "send", send)
+    update = make_update()
+
+    assert asyncio.run(utils.send_to_topic("Guerra 1-0 (100%)", update)) is True
+
+    send.assert_awaited_once_with(
+        chat_id=TEST_CHAT_ID,
+        text="Guerra 1\\-0 \\(100%\\)",
+        message_thread_id=TEST_TOPIC_ID,
+        parse_mode="MarkdownV2"
+    )
+    update.message.reply_text.assert_not_awaited()
+
+
+def test_send_to_topic_rejects_other_chats(monkeypatch):
+    send = AsyncMock()
+    monkeypatch.setattr(utils.send_queue, "send", send)
+    update = make_update(chat_id=42)
+
+    assert asyncio.run(utils.send_to_topic("hola", update)) is None
+
+    send.assert_not_awaited()
+    update.message.reply_text.assert_awaited_once()